@@ -22,7 +22,7 @@ except Exception as e:
 @app.callback(Output('header-status', 'children'), Input('url', 'pathname'))
 def update_header_status(pathname):
     if not CLIENT_CONNECTED: return dbc.Alert("❌ Connection Failed", color="danger")
-    health = analyzer.client.get("_cluster/health") or {}
+    health = analyzer.cached_get("_cluster/health") or {}
     status = health.get('status', 'N/A').upper()
     color = "success" if status == "GREEN" else "warning" if status == "YELLOW" else "danger"
     return dbc.Row([
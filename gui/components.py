@@ -4,6 +4,7 @@ from dash import dcc, html
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
+from src.config import REFRESH_INTERVAL
 
 def create_kpi_panel(title, value, color="white"):
     return html.Div([html.P(title, className="kpi-title mb-1"), html.H2(value, className=f"kpi-value text-{color}")], className="kpi-card text-center")
@@ -17,7 +18,7 @@ def create_view_panel(header_text, children):
     return html.Div([html.Div(header_text, className="view-panel-header"), html.Div(children, className="view-panel-body")], className="view-panel")
 
 def render_dashboard_general(analyzer):
-    analyzer.fetch_all_data()
+    analyzer.fetch_all_data(max_age=REFRESH_INTERVAL)
     health, nodes_df = analyzer.cluster_health, analyzer.nodes_df
     unassigned = health.get('unassigned_shards', 0)
     avg_cpu = nodes_df['cpu_percent'].mean() if not nodes_df.empty else 0
@@ -28,7 +29,7 @@ def render_dashboard_general(analyzer):
     ])])
 
 def render_node_health_view(analyzer):
-    analyzer.fetch_all_data()
+    analyzer.fetch_all_data(for_deep_dive=True, max_age=REFRESH_INTERVAL)
     nodes_df = analyzer.nodes_df.sort_values(by='cpu_percent', ascending=False)
     if nodes_df.empty: return create_view_panel("Salud de Nodos", [dbc.Alert("No data.", color="warning")])
     fig = go.Figure(data=[go.Bar(x=nodes_df['node_name'], y=nodes_df['cpu_percent'], name='CPU %', marker_color='#3e92cc')])
@@ -36,23 +37,21 @@ def render_node_health_view(analyzer):
     return create_view_panel("Uso de CPU por Nodo", [dcc.Graph(figure=fig), html.Hr(), df_to_dbc_table(nodes_df[['node_name', 'tier', 'cpu_percent', 'heap_percent']].round(1))])
 
 def render_shard_distribution_view(analyzer):
-    analyzer.fetch_all_data()
+    analyzer.fetch_all_data(max_age=REFRESH_INTERVAL)
     shards_df = analyzer.shards_df.copy()
     if not shards_df.empty:
         shards_df['pattern'] = shards_df['index'].str.extract(r'(^\.?[a-zA-Z_.-]+)')[0].fillna('otros')
         shards_df['datastream'] = shards_df['index'].str.extract(r'^\.ds-([a-zA-Z_.-]+?)-')[0].fillna('No Datastream')
-        shards_df['store'] = pd.to_numeric(shards_df['store'], errors='coerce').fillna(0)
-        shards_df['docs'] = pd.to_numeric(shards_df['docs'], errors='coerce').fillna(0)
 
     controls = dbc.Card(dbc.CardBody(dbc.Row([
         dbc.Col([html.Label("Métrica:", className="fw-bold"), dcc.Dropdown(id='treemap-metric-selector', options=[{'label': 'Tamaño (MB)', 'value': 'store'}, {'label': 'Documentos', 'value': 'docs'}], value='store', clearable=False)], width=6),
         dbc.Col([html.Label("Jerarquía:", className="fw-bold"), dcc.Dropdown(id='treemap-hierarchy-selector', options=[{'label': 'Patrón > Nodo', 'value': 'pattern,node'}, {'label': 'Datastream > Nodo', 'value': 'datastream,node'}], value='pattern,node', clearable=False)], width=6),
     ])), className="mb-4")
-    return create_view_panel("Distribución de Shards (Treemap Interactivo)", [dcc.Store(id='shard-data-store', data=shards_df.to_dict('records')), controls, dbc.Spinner(dcc.Graph(id='shard-treemap-graph', style={'height': '70vh'}))])
+    return create_view_panel("Distribución de Shards (Treemap Interactivo)", [dcc.Store(id='shard-data-store', data=shards_df.to_dict('list')), controls, dbc.Spinner(dcc.Graph(id='shard-treemap-graph', style={'height': '70vh'}))])
 
 def render_slow_tasks_view(analyzer):
-    tasks_data = analyzer.client.get("_tasks", params={'actions': '*search*', 'detailed': 'true'})
+    tasks_data = analyzer.cached_get("_tasks", params={'actions': '*search*', 'detailed': 'true'})
     if not tasks_data: return create_view_panel("Tareas Lentas", [dbc.Alert("No se pudo obtener info de tareas.", color="danger")])
-    slow_tasks = [{'Nodo': n.get('name'), 'Tiempo (min)': f"{t.get('running_time_in_nanos', 0)/6e10:.2f}", 'Descripción': t.get('description')} for n in tasks_data.get('nodes', {}).values() for t in n.get('tasks', {}).values() if t.get('running_time_in_nanos', 0)/6e10 > 1]
+    slow_tasks = [{'Nodo': n.get('name'), 'Tiempo (min)': f"{t['running_time_in_nanos']/6e10:.2f}", 'Descripción': t.get('description')} for n in tasks_data.get('nodes', {}).values() for t in n.get('tasks', {}).values() if t.get('running_time_in_nanos', 0) > 6e10]
     if not slow_tasks: return create_view_panel("Tareas Lentas", [dbc.Alert("✅ No se detectaron tareas lentas.", color="success")])
     return create_view_panel(f"{len(slow_tasks)} Tareas Lentas Encontradas", [df_to_dbc_table(pd.DataFrame(slow_tasks))])
\ No newline at end of file
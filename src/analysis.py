@@ -1,10 +1,13 @@
 # src/analysis.py
 import time
 import re
+import copy
+import numpy as np
 import pandas as pd
-import json
 import fnmatch
-from rich.console import Console
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from rich.console import Console, Group
 from rich.live import Live
 from rich.layout import Layout
 from rich.panel import Panel
@@ -24,47 +27,154 @@ from .renderer import (
 from .config import (
     REFRESH_INTERVAL, LONG_RUNNING_TASK_MINUTES,
     HIGH_SHARD_COUNT_TEMPLATE_THRESHOLD, DUSTY_SHARD_MB_THRESHOLD,
-    HEAP_OLD_GEN_THRESHOLD, GC_TIME_THRESHOLD, CPU_USAGE_THRESHOLD
+    HEAP_OLD_GEN_THRESHOLD, GC_TIME_THRESHOLD, CPU_USAGE_THRESHOLD,
+    MAX_PARALLEL_REQUESTS, STATIC_METADATA_TTL_S, STATIC_AUDIT_MAX_AGE_S
 )
 
 console = Console()
 
+# Fragmentos de nombre de campo que identifican a un inquilino en un filtro `term`.
+_TENANT_KEYS = ('customer_id', 'tenant_id')
+# Primer filtro `term` sobre un campo de inquilino, leído directamente del texto de la descripción de la tarea.
+# Acepta la forma corta (`"customer_id": "acme"`) y la larga (`"customer_id": {"value": "acme"}`).
+_TENANT_RE = re.compile(
+    r'"term"\s*:\s*\{\s*"[^"]*(?:%s)[^"]*"\s*:\s*(?:\{\s*"value"\s*:\s*)?"?([^",{}\]\s]+)"?'
+    % '|'.join(map(re.escape, _TENANT_KEYS))
+)
+
+# Fechas y contadores de rollover que se colapsan en '-*' para agrupar índices por patrón.
+_PATTERN_RE = re.compile(r'\d{4}[-.]\d{2}[-.]\d{2}|-\d{6}')
+
+# Columnas fijas de la tabla de distribución de shards (cabecera, opciones); la primera depende del agrupamiento.
+_SHARD_DISTRIBUTION_COLUMNS = (
+    ("Total Shards", {'justify': 'right'}), ("Primarios", {'justify': 'right'}), ("Réplicas", {'justify': 'right'}),
+    ("Tamaño (GB)", {'justify': 'right'}), ("Nodos", {'justify': 'right'}),
+)
+
+@functools.lru_cache(maxsize=1024)
+def _compile_index_patterns(patterns):
+    """Separa los patrones de plantilla de la forma `prefijo*` (comparables con startswith) del resto.
+
+    `patterns` debe ser una tupla: el resultado se memoiza durante toda la sesión.
+    """
+    prefixes, globs = [], []
+    for p in patterns:
+        if p.endswith('*') and not any(c in p[:-1] for c in '*?['):
+            prefixes.append(p[:-1])
+        else:
+            globs.append(p)
+    regex = re.compile('|'.join(fnmatch.translate(p) for p in globs)) if globs else None
+    return tuple(prefixes), regex
+
+def _match_index_patterns(index_names, prefixes, regex):
+    """Máscara booleana de los índices que casan con algún patrón compilado por `_compile_index_patterns`."""
+    mask = index_names.str.startswith(prefixes) if prefixes else pd.Series(False, index=index_names.index)
+    if regex is not None:
+        mask |= index_names.str.match(regex)
+    return mask
+
+def _summarize_shards(shards_df, group_keys):
+    """Resumen de shards por grupo (conteos, tamaño y nodos distintos) con `np.bincount` sobre códigos enteros.
+
+    `group_keys` es una Series alineada con `shards_df`; su nombre da nombre a la columna del grupo.
+    """
+    codes, groups = pd.factorize(group_keys)
+    n_groups = len(groups)
+    prirep = shards_df['prirep']
+    # Nodos distintos por grupo: pares (grupo, nodo) únicos, ignorando los shards sin asignar.
+    node_codes, nodes = pd.factorize(shards_df['node'])
+    assigned = node_codes >= 0
+    group_node_pairs = np.unique(codes[assigned] * len(nodes) + node_codes[assigned])
+    return pd.DataFrame({
+        group_keys.name: groups,
+        'total_shards': np.bincount(codes, minlength=n_groups),
+        'primaries': np.bincount(codes, weights=(prirep == 'p').to_numpy(), minlength=n_groups).astype(int),
+        'replicas': np.bincount(codes, weights=(prirep == 'r').to_numpy(), minlength=n_groups).astype(int),
+        'total_gb': np.bincount(codes, weights=shards_df['store'].to_numpy(dtype='float64'), minlength=n_groups) / 1024,
+        'nodes_involved': np.bincount(group_node_pairs // max(len(nodes), 1), minlength=n_groups),
+    })
+
+def _count_mapping_fields(mapping):
+    """Cuenta los campos de un mapeo, incluidos los anidados, recorriéndolo con una pila explícita."""
+    count = 0
+    stack = [mapping]
+    while stack:
+        props = stack.pop().get('properties')
+        if props:
+            count += len(props)
+            stack.extend(props.values())
+    return count
+
 # --- Funciones de Control y Flujo de Análisis ---
 
+def _run_live_loop(fetch, render):
+    """Bucle común de los dashboards en vivo.
+
+    La captura del siguiente tick viaja en un hilo mientras se dibuja el actual, así el tick cuesta
+    max(red, render) en lugar de la suma. `render` recibe una copia superficial del analizador tomada
+    antes de lanzar esa captura: como cada captura reasigna sus frames en vez de mutarlos, la copia
+    queda estable aunque el hilo avance. Cada tick dura `REFRESH_INTERVAL` desde su inicio y `render`
+    devuelve None cuando no hay nada nuevo que dibujar.
+
+    Si el clúster responde lento, el tick se alarga hasta el doble de la latencia media (EWMA) de
+    las capturas, para no encolar una captura nueva mientras la anterior sigue en el servidor.
+    """
+    def timed_fetch():
+        start = time.monotonic()
+        return fetch(), time.monotonic() - start
+
+    with Live(console=console, screen=True, auto_refresh=False) as live, ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(timed_fetch)
+        latency_ewma = None
+        while True:
+            tick_start = time.monotonic()
+            view, latency = pending.result()
+            latency_ewma = latency if latency_ewma is None else 0.8 * latency_ewma + 0.2 * latency
+            pending = executor.submit(timed_fetch)
+            renderable = render(view)
+            if renderable is not None:
+                live.update(renderable, refresh=True)
+            tick = max(REFRESH_INTERVAL, 2 * latency_ewma)
+            time.sleep(max(0, tick - (time.monotonic() - tick_start)))
+
+def _capture(analyzer, **fetch_kwargs):
+    """Hace una captura y devuelve una vista inmutable (copia superficial) del analizador para dibujarla."""
+    analyzer.fetch_all_data(**fetch_kwargs)
+    analyzer.shards_df  # Materializa el frame perezoso aquí, para que la vista lo comparta con el analizador.
+    return copy.copy(analyzer)
+
 def run_live_dashboard(analyzer: ClusterAnalyzer):
     """Ejecuta el dashboard principal en modo de actualización en vivo."""
     try:
-        with Live(console=console, screen=True, auto_refresh=False) as live:
-            while True:
-                analyzer.fetch_all_data()
-                dashboard = render_dashboard_layout(analyzer)
-                live.update(dashboard, refresh=True)
-                time.sleep(REFRESH_INTERVAL)
+        _run_live_loop(lambda: _capture(analyzer), render_dashboard_layout)
     except KeyboardInterrupt:
         console.print("\n[bold]Volviendo al menú principal...[/bold]")
 
 def analyze_node_deep_dive(analyzer: ClusterAnalyzer):
     """Ejecuta un dashboard en vivo para todos los nodos, mostrando un desglose detallado."""
+    def render(view):
+        nodes_df = view.nodes_df
+        if nodes_df.empty:
+            return Panel("[yellow]Esperando datos de nodos...[/yellow]", border_style="yellow")
+        layout = Layout(name="deep_dive_root")
+        node_panels = []
+        # Solo se necesita el orden por CPU de dos columnas: se ordenan los arrays, no el frame completo.
+        order = np.argsort(-nodes_df['cpu_percent'].to_numpy(), kind='stable')
+        stats_by_node = view.node_stats_raw.get('nodes', {})
+        prev_stats_by_node = view.previous_node_stats_raw.get('nodes', {})
+        for node_name, node_id in zip(nodes_df['node_name'].to_numpy()[order], nodes_df['node_id'].to_numpy()[order]):
+            node_stats = stats_by_node.get(node_id, {})
+            prev_node_stats = prev_stats_by_node.get(node_id, {})
+            tp_panel = render_thread_pool_panel(node_stats, prev_node_stats)
+            cb_panel = render_breaker_panel(node_stats, prev_node_stats)
+            node_layout = Layout(name=node_name)
+            node_layout.split_row(tp_panel, cb_panel)
+            node_panels.append(Panel(node_layout, title=f"[b cyan]Nodo: {node_name}[/b cyan]", border_style="magenta"))
+        layout.split_column(*node_panels)
+        return layout
+
     try:
-        with Live(console=console, screen=True, auto_refresh=False) as live:
-            while True:
-                analyzer.fetch_all_data(for_deep_dive=True)
-                layout = Layout(name="deep_dive_root")
-                node_panels = []
-                sorted_nodes = analyzer.nodes_df.sort_values(by='cpu_percent', ascending=False)
-                for _, node_row in sorted_nodes.iterrows():
-                    node_name = node_row['node_name']
-                    node_id = node_row['node_id']
-                    node_stats = analyzer.node_stats_raw.get('nodes', {}).get(node_id, {})
-                    prev_node_stats = analyzer.previous_node_stats_raw.get('nodes', {}).get(node_id, {})
-                    tp_panel = render_thread_pool_panel(node_stats, prev_node_stats)
-                    cb_panel = render_breaker_panel(node_stats, prev_node_stats)
-                    node_layout = Layout(name=node_name)
-                    node_layout.split_row(tp_panel, cb_panel)
-                    node_panels.append(Panel(node_layout, title=f"[b cyan]Nodo: {node_name}[/b cyan]", border_style="magenta"))
-                layout.split_column(*node_panels)
-                live.update(layout, refresh=True)
-                time.sleep(REFRESH_INTERVAL)
+        _run_live_loop(lambda: _capture(analyzer, for_deep_dive=True), render)
     except KeyboardInterrupt:
         console.print(f"\n[bold]Finalizando diagnóstico profundo...[/bold]")
 
@@ -79,32 +189,36 @@ def analyze_shard_distribution_interactive(analyzer: ClusterAnalyzer):
         
     analysis_type = Prompt.ask("¿Analizar por [1] Patrón de Índice o [2] Índice Individual?", choices=["1", "2"], default="1")
     sort_choices = {"1": ("Total Shards", "total_shards"), "2": ("Tamaño Total (GB)", "total_gb"), "3": ("Primarios", "primaries"), "4": ("Nodos Involucrados", "nodes_involved")}
-    console.print("\nElige un criterio para ordenar:")
-    for key, (desc, _) in sort_choices.items(): console.print(f"  [bold]{key}[/bold]: {desc}")
+    console.print("\nElige un criterio para ordenar:\n" + "\n".join(f"  [bold]{key}[/bold]: {desc}" for key, (desc, _) in sort_choices.items()))
     sort_option = Prompt.ask("Opción de ordenamiento", choices=list(sort_choices.keys()), default="1")
     sort_by_column = sort_choices[sort_option][1]
     group_by_col = 'pattern' if analysis_type == '1' else 'index'
     
+    rendered_shards_df = None
+
+    def render(view):
+        nonlocal rendered_shards_df
+        # fetch_all_data conserva el mismo DataFrame si _cat/shards no cambió: no hay nada que recalcular.
+        if view.shards_df is rendered_shards_df:
+            return None
+        rendered_shards_df = shards_df = view.shards_df
+        group_keys = shards_df['index'] if group_by_col == 'index' else shards_df['index'].str.replace(_PATTERN_RE, '-*', regex=True).rename('pattern')
+        summary_df = _summarize_shards(shards_df, group_keys)
+        table = Table(title=f"Distribución de Shards por {'Patrón' if analysis_type == '1' else 'Índice'} (ordenado por {sort_choices[sort_option][0]})")
+        table.add_column(group_by_col.capitalize(), style="cyan", max_width=50)
+        for header, options in _SHARD_DISTRIBUTION_COLUMNS:
+            table.add_column(header, **options)
+        # Solo se muestran los 20 primeros: selección parcial en lugar de ordenar todos los grupos.
+        top_df = summary_df.nlargest(20, sort_by_column)
+        # Las columnas se convierten a texto de una vez; el bucle solo reparte tuplas ya formateadas.
+        columns = [top_df[group_by_col].astype(str)] + [top_df[col].astype(str) for col in ('total_shards', 'primaries', 'replicas')]
+        columns += [top_df['total_gb'].map('{:.2f}'.format), top_df['nodes_involved'].astype(str)]
+        for cells in zip(*(col.tolist() for col in columns)):
+            table.add_row(*cells)
+        return Panel(table)
+
     try:
-        with Live(console=console, screen=True, auto_refresh=False) as live:
-            while True:
-                analyzer.fetch_all_data()
-                shards_df = analyzer.shards_df.copy()
-                shards_df['pattern'] = shards_df['index'].apply(lambda x: re.sub(r'\d{4}[-.]\d{2}[-.]\d{2}|-\d{6}', '-*', x))
-                shards_df.loc[:, 'store'] = pd.to_numeric(shards_df['store'], errors='coerce').fillna(0)
-                summary_df = shards_df.groupby(group_by_col).agg(total_shards=('shard', 'count'), primaries=('prirep', lambda x: (x == 'p').sum()), replicas=('prirep', lambda x: (x == 'r').sum()), total_gb=('store', lambda x: x.sum() / 1024), nodes_involved=('node', 'nunique')).reset_index()
-                sorted_df = summary_df.sort_values(by=sort_by_column, ascending=False)
-                table = Table(title=f"Distribución de Shards por {'Patrón' if analysis_type == '1' else 'Índice'} (ordenado por {sort_choices[sort_option][0]})")
-                table.add_column(group_by_col.capitalize(), style="cyan", max_width=50)
-                table.add_column("Total Shards", justify="right")
-                table.add_column("Primarios", justify="right")
-                table.add_column("Réplicas", justify="right")
-                table.add_column("Tamaño (GB)", justify="right")
-                table.add_column("Nodos", justify="right")
-                for _, row in sorted_df.head(20).iterrows():
-                    table.add_row(row[group_by_col], str(row['total_shards']), str(row['primaries']), str(row['replicas']), f"{row['total_gb']:.2f}", str(row['nodes_involved']))
-                live.update(Panel(table), refresh=True)
-                time.sleep(REFRESH_INTERVAL)
+        _run_live_loop(lambda: _capture(analyzer), render)
     except KeyboardInterrupt:
         console.print("\n[bold]Volviendo al menú de análisis...[/bold]")
 
@@ -114,51 +228,39 @@ def analyze_node_load_correlation(analyzer: ClusterAnalyzer):
     """Correlaciona la carga de CPU y memoria de un nodo con la carga de escritura/lectura generada por sus shards."""
     console.print(Rule("[bold]Análisis de Carga de Nodos por Actividad de Shards[/bold]"))
     console.print("[yellow]Capturando métricas para calcular tasas de actividad...[/yellow]")
-    analyzer.fetch_all_data()
-    time.sleep(REFRESH_INTERVAL)
-    analyzer.fetch_all_data()
+    analyzer.fetch_rate_sample(REFRESH_INTERVAL)
 
-    nodes_df = analyzer.nodes_df.copy()
-    shards_df = analyzer.shards_df.copy()
-    indices_df = analyzer.indices_df.copy()
-    previous_indices_df = analyzer.previous_indices_df.copy()
+    nodes_df = analyzer.nodes_df
+    shards_df = analyzer.shards_df
+    indices_df = analyzer.indices_df
+    previous_indices_df = analyzer.previous_indices_df
 
     if any(df.empty for df in [nodes_df, shards_df, indices_df, previous_indices_df]):
         console.print("[red]No se pudieron obtener datos completos para el análisis de carga.[/red]")
         return
 
-    merged_indices = pd.merge(indices_df, previous_indices_df[['index', 'indexing_total', 'search_total']], on='index', how='left', suffixes=('', '_prev'))
-    merged_indices['indexing_total_prev'] = merged_indices['indexing_total_prev'].fillna(merged_indices['indexing_total'])
-    merged_indices['search_total_prev'] = merged_indices['search_total_prev'].fillna(merged_indices['search_total'])
-    time_delta = REFRESH_INTERVAL if REFRESH_INTERVAL > 0 else 1
-    indices_df['write_rate'] = (merged_indices['indexing_total'] - merged_indices['indexing_total_prev']) / time_delta
-    indices_df['search_rate'] = (merged_indices['search_total'] - merged_indices['search_total_prev']) / time_delta
-
-    shard_activity_df = pd.merge(shards_df, indices_df[['index', 'write_rate', 'search_rate']], on='index', how='left').fillna(0)
-    
-    node_loads = []
-    for _, node_row in nodes_df.iterrows():
-        node_name = node_row['node_name']
-        shards_on_node = shard_activity_df[shard_activity_df['node'] == node_name]
-        primary_shards = shards_on_node[shards_on_node['prirep'] == 'p']
-        write_load = primary_shards['write_rate'].sum()
-        search_load = shards_on_node['search_rate'].sum()
-        node_loads.append({
-            'Nodo': node_name, 'CPU %': node_row['cpu_percent'], 'Heap %': node_row['heap_percent'],
-            'Primarios': len(primary_shards), 'Total Shards': len(shards_on_node),
-            'Carga Escritura (docs/s)': write_load, 'Carga Búsqueda (req/s)': search_load
-        })
+    shard_activity_df = pd.merge(shards_df, indices_df[['index', 'write_rate', 'search_rate']], on='index', how='left').fillna({'write_rate': 0, 'search_rate': 0})
     
-    load_df = pd.DataFrame(node_loads).sort_values(by='CPU %', ascending=False)
+    is_primary = shard_activity_df['prirep'] == 'p'
+    shard_activity_df = shard_activity_df.assign(is_primary=is_primary, primary_write_rate=shard_activity_df['write_rate'].where(is_primary, 0))
+    node_activity = shard_activity_df.groupby('node', observed=True).agg(
+        primaries=('is_primary', 'sum'), total_shards=('shard', 'count'),
+        write_load=('primary_write_rate', 'sum'), search_load=('search_rate', 'sum')
+    )
+    load_df = pd.merge(nodes_df[['node_name', 'cpu_percent', 'heap_percent']], node_activity, left_on='node_name', right_index=True, how='left')
+    load_df = load_df.fillna(0).astype({'primaries': int, 'total_shards': int}).rename(columns={
+        'node_name': 'Nodo', 'cpu_percent': 'CPU %', 'heap_percent': 'Heap %', 'primaries': 'Primarios', 'total_shards': 'Total Shards',
+        'write_load': 'Carga Escritura (docs/s)', 'search_load': 'Carga Búsqueda (req/s)'
+    }).sort_values(by='CPU %', ascending=False)
     table = Table(title="Correlación de Carga de Nodos y Actividad de Shards")
     for col in load_df.columns:
         table.add_column(col, justify="right", style="cyan" if col == 'Nodo' else "white")
     
-    for _, row in load_df.iterrows():
+    for node_name, cpu, heap, primaries, total_shards, write_load, search_load in zip(*(load_df[col].to_numpy() for col in load_df.columns)):
         table.add_row(
-            row['Nodo'], f"{row['CPU %']:.0f}", f"{row['Heap %']:.0f}", str(row['Primarios']),
-            str(row['Total Shards']), f"[green]{row['Carga Escritura (docs/s)']:.1f}[/green]",
-            f"[yellow]{row['Carga Búsqueda (req/s)']:.1f}[/yellow]"
+            node_name, f"{cpu:.0f}", f"{heap:.0f}", str(primaries),
+            str(total_shards), f"[green]{write_load:.1f}[/green]",
+            f"[yellow]{search_load:.1f}[/yellow]"
         )
     
     console.print(table)
@@ -169,29 +271,21 @@ def analyze_node_index_correlation(analyzer: ClusterAnalyzer):
     """Analiza y muestra el desbalance de shards primarios, enriquecido con métricas de actividad."""
     console.print(Rule("[bold]Análisis de Desbalance y Actividad de Shards (Vista Agrupada)[/bold]"))
     console.print("[yellow]Capturando métricas para calcular tasas de actividad...[/yellow]")
-    analyzer.fetch_all_data()
-    time.sleep(REFRESH_INTERVAL)
-    analyzer.fetch_all_data()
+    analyzer.fetch_rate_sample(REFRESH_INTERVAL)
 
-    shards_df, indices_df, previous_indices_df = analyzer.shards_df.copy(), analyzer.indices_df.copy(), analyzer.previous_indices_df.copy()
+    shards_df, indices_df, previous_indices_df = analyzer.shards_df, analyzer.indices_df, analyzer.previous_indices_df
 
     if any(df.empty for df in [shards_df, indices_df, previous_indices_df]):
         console.print("[red]No se pudieron obtener suficientes datos para el análisis de actividad.[/red]")
         return
     
-    merged_df = pd.merge(indices_df, previous_indices_df[['index', 'indexing_total', 'search_total']], on='index', how='left', suffixes=('', '_prev'))
-    merged_df['indexing_total_prev'] = merged_df['indexing_total_prev'].fillna(merged_df['indexing_total'])
-    merged_df['search_total_prev'] = merged_df['search_total_prev'].fillna(merged_df['search_total'])
-    time_delta = REFRESH_INTERVAL if REFRESH_INTERVAL > 0 else 1
-    indices_df['write_rate'] = (merged_df['indexing_total'] - merged_df['indexing_total_prev']) / time_delta
-    indices_df['search_rate'] = (merged_df['search_total'] - merged_df['search_total_prev']) / time_delta
+    indices_df = indices_df.assign(pattern=indices_df['index'].str.replace(_PATTERN_RE, '-*', regex=True))
     
-    primary_shards = shards_df[shards_df['prirep'] == 'p'].copy()
-    primary_shards['pattern'] = primary_shards['index'].apply(lambda x: re.sub(r'\d{4}[-.]\d{2}[-.]\d{2}|-\d{6}', '-*', x))
-    shard_counts = primary_shards.groupby(['pattern', 'node']).size().reset_index(name='shard_count')
+    primary_shards = shards_df.loc[shards_df['prirep'] == 'p', ['index', 'node']]
+    primary_shards = primary_shards.assign(pattern=primary_shards['index'].str.replace(_PATTERN_RE, '-*', regex=True))
+    shard_counts = primary_shards.groupby(['pattern', 'node'], observed=True).size().reset_index(name='shard_count')
     imbalance_stats = shard_counts.groupby('pattern')['shard_count'].agg(std_dev='std', node_count='count').fillna(0)
     
-    indices_df['pattern'] = indices_df['index'].apply(lambda x: re.sub(r'\d{4}[-.]\d{2}[-.]\d{2}|-\d{6}', '-*', x))
     pattern_activity = indices_df.groupby('pattern')[['write_rate', 'search_rate']].sum().reset_index()
 
     imbalanced_patterns = pd.merge(imbalance_stats[imbalance_stats['node_count'] > 1].reset_index(), pattern_activity, on='pattern', how='left').fillna(0)
@@ -211,17 +305,22 @@ def analyze_node_index_correlation(analyzer: ClusterAnalyzer):
     table.add_column("Nodo Afectado", style="magenta", no_wrap=True)
     table.add_column("N° Shards", style="white", justify="right")
 
-    for _, pattern_row in imbalanced_patterns.iterrows():
-        pattern, std_dev, write_rate, search_rate = pattern_row['pattern'], pattern_row['std_dev'], pattern_row.get('write_rate', 0), pattern_row.get('search_rate', 0)
-        nodes_for_pattern = shard_counts[shard_counts['pattern'] == pattern].sort_values(by='shard_count', ascending=False)
-        table.add_section()
-        for i, node_row in enumerate(nodes_for_pattern.iterrows()):
-            node_name, shard_count = node_row[1]['node'], node_row[1]['shard_count']
-            style = "on red" if shard_count == nodes_for_pattern['shard_count'].max() and len(nodes_for_pattern) > 1 else ""
-            if i == 0:
-                table.add_row(pattern, f"{std_dev:.2f}", f"{write_rate:.1f}", f"{search_rate:.1f}", Text(node_name, style=style), Text(str(shard_count), style=style))
-            else:
-                table.add_row("", "", "", "", Text(node_name, style=style), Text(str(shard_count), style=style))
+    # Una fila por (patrón, nodo), ya ordenada para la tabla: patrones por desbalance y, dentro de cada uno, nodos por N° de shards.
+    # Todos los patrones desbalanceados tienen más de un nodo, así que el máximo de cada grupo siempre se resalta.
+    nodes_view = pd.merge(shard_counts, imbalanced_patterns[['pattern', 'std_dev', 'write_rate', 'search_rate']], on='pattern')
+    nodes_view['max_count'] = nodes_view.groupby('pattern')['shard_count'].transform('max')
+    nodes_view = nodes_view.sort_values(by=['std_dev', 'pattern', 'shard_count'], ascending=[False, True, False])
+
+    previous_pattern = None
+    for row in nodes_view.itertuples(index=False):
+        style = "on red" if row.shard_count == row.max_count else ""
+        node_cells = (Text(row.node, style=style), Text(str(row.shard_count), style=style))
+        if row.pattern != previous_pattern:
+            table.add_section()
+            table.add_row(row.pattern, f"{row.std_dev:.2f}", f"{row.write_rate:.1f}", f"{row.search_rate:.1f}", *node_cells)
+            previous_pattern = row.pattern
+        else:
+            table.add_row("", "", "", "", *node_cells)
     console.print(table)
     
     info_text = "..." # El texto de la guía de diagnóstico se puede mantener aquí.
@@ -232,17 +331,19 @@ def analyze_slow_tasks(analyzer: ClusterAnalyzer):
     """Identifica tareas de búsqueda lentas que se están ejecutando en el clúster."""
     console.print(Rule("[bold]Identificación de Tareas de Búsqueda Lentas[/bold]"))
     
-    tasks_data = analyzer.client.get("_tasks", params={'actions': '*search*', 'detailed': 'true'})
+    tasks_data = analyzer.cached_get("_tasks", params={'actions': '*search*', 'detailed': 'true'})
     if not tasks_data or 'nodes' not in tasks_data:
         console.print("[red]No se pudo obtener información de tareas.[/red]")
         return
 
-    slow_tasks = [
-        {'node': node_info.get('name'), 'time_min': task_info.get('running_time_in_nanos', 0) / 60e9, 'description': task_info.get('description', 'N/A')}
-        for node_id, node_info in tasks_data['nodes'].items()
-        for task_id, task_info in node_info['tasks'].items()
-        if task_info.get('running_time_in_nanos', 0) / 60e9 > LONG_RUNNING_TASK_MINUTES
-    ]
+    threshold_nanos = LONG_RUNNING_TASK_MINUTES * 60e9
+    slow_tasks = []
+    for node_info in tasks_data['nodes'].values():
+        for task_info in node_info['tasks'].values():
+            running_nanos = task_info.get('running_time_in_nanos', 0)
+            if running_nanos > threshold_nanos:
+                slow_tasks.append({'node': node_info.get('name'), 'time_min': running_nanos / 60e9, 'description': task_info.get('description', 'N/A')})
+    slow_tasks.sort(key=lambda x: x['time_min'], reverse=True)
     
     if not slow_tasks:
         console.print(f"[green]✅ No se detectaron tareas de búsqueda lentas por encima de {LONG_RUNNING_TASK_MINUTES} minutos.[/green]")
@@ -254,7 +355,7 @@ def analyze_slow_tasks(analyzer: ClusterAnalyzer):
     table.add_column("Tiempo (min)", justify="right", style="yellow")
     table.add_column("Descripción", style="white")
 
-    for task in sorted(slow_tasks, key=lambda x: x['time_min'], reverse=True):
+    for task in slow_tasks:
         table.add_row(task['node'], f"{task['time_min']:.2f}", task['description'])
 
     console.print(table)
@@ -263,9 +364,9 @@ def analyze_slow_tasks(analyzer: ClusterAnalyzer):
 def analyze_index_templates(analyzer: ClusterAnalyzer):
     """Evalúa las plantillas de índice en busca de problemas y muestra su impacto."""
     console.print(Rule("[bold]Diagnóstico y Relevancia de Plantillas de Índice[/bold]"))
-    analyzer.fetch_all_data()
+    analyzer.fetch_all_data(max_age=STATIC_AUDIT_MAX_AGE_S)
 
-    templates_data = analyzer.client.get("_index_template")
+    templates_data = analyzer.cached_get("_index_template", ttl=STATIC_METADATA_TTL_S)
     indices_df = analyzer.indices_df
     
     if not templates_data or 'index_templates' not in templates_data:
@@ -276,9 +377,6 @@ def analyze_index_templates(analyzer: ClusterAnalyzer):
         console.print("[yellow]No hay datos de índices para correlacionar con las plantillas.[/yellow]")
         return
 
-    indices_df['docs.count'] = pd.to_numeric(indices_df['docs.count'], errors='coerce').fillna(0)
-    indices_df['store.size'] = pd.to_numeric(indices_df['store.size'], errors='coerce').fillna(0)
-
     table = Table(title="Análisis de Plantillas de Índice y su Impacto")
     table.add_column("Plantilla", style="cyan")
     table.add_column("Índices", justify="right", style="magenta")
@@ -286,18 +384,19 @@ def analyze_index_templates(analyzer: ClusterAnalyzer):
     table.add_column("Tamaño Total", justify="right", style="yellow")
     table.add_column("Diagnóstico", style="white")
 
+    index_names = indices_df['index']
+    docs_counts, store_sizes = indices_df['docs.count'].to_numpy(), indices_df['store.size'].to_numpy()
+
     for template_info in templates_data['index_templates']:
         name = template_info['name']
         template = template_info['index_template']
         patterns = template.get('index_patterns', [])
         
-        matching_indices = indices_df[indices_df['index'].apply(
-            lambda idx: any(fnmatch.fnmatch(idx, pattern) for pattern in patterns)
-        )]
+        matches = _match_index_patterns(index_names, *_compile_index_patterns(tuple(patterns))).to_numpy()
         
-        index_count = len(matching_indices)
-        total_docs = matching_indices['docs.count'].sum()
-        total_size_mb = matching_indices['store.size'].sum()
+        index_count = int(matches.sum())
+        total_docs = docs_counts[matches].sum()
+        total_size_mb = store_sizes[matches].sum()
         
         size_str = f"{total_size_mb / 1024:.2f} GB" if total_size_mb > 1024 else f"{total_size_mb:.1f} MB"
 
@@ -329,18 +428,18 @@ def analyze_index_templates(analyzer: ClusterAnalyzer):
 def analyze_dusty_shards(analyzer: ClusterAnalyzer):
     """Identifica shards vacíos o extremadamente pequeños ('polvo de shards')."""
     console.print(Rule("[bold]Detección de Shards Vacíos y 'Polvo de Shards'[/bold]"))
-    analyzer.fetch_all_data()
-    shards_df = analyzer.shards_df.copy()
+    analyzer.fetch_all_data(max_age=REFRESH_INTERVAL)
+    shards_df = analyzer.shards_df
 
     if shards_df.empty:
         console.print("[yellow]No se pudieron obtener datos de shards para el análisis.[/yellow]")
         return
     
-    shards_df['docs'] = pd.to_numeric(shards_df['docs'], errors='coerce').fillna(0)
-    shards_df['store'] = pd.to_numeric(shards_df['store'], errors='coerce').fillna(0)
-    
-    empty_shards = shards_df[(shards_df['docs'] == 0) & (shards_df['state'] == 'STARTED')]
-    dusty_shards = shards_df[(shards_df['docs'] > 0) & (shards_df['store'] < DUSTY_SHARD_MB_THRESHOLD) & (shards_df['state'] == 'STARTED')]
+    # Máscaras sobre arrays NumPy: el filtro de estado se evalúa una vez y se comparte entre ambas.
+    docs, store = shards_df['docs'].to_numpy(), shards_df['store'].to_numpy()
+    started = (shards_df['state'] == 'STARTED').to_numpy()
+    empty_shards = shards_df[started & (docs == 0)]
+    dusty_shards = shards_df[started & (docs > 0) & (store < DUSTY_SHARD_MB_THRESHOLD)]
 
     if empty_shards.empty and dusty_shards.empty:
         console.print("[green]✅ No se detectaron shards vacíos ni 'polvo de shards' problemáticos.[/green]")
@@ -351,16 +450,16 @@ def analyze_dusty_shards(analyzer: ClusterAnalyzer):
     empty_table.add_column("Índice", style="cyan")
     empty_table.add_column("Shard", justify="right")
     empty_table.add_column("Nodo", style="magenta")
-    for _, row in empty_shards.head(10).iterrows():
-        empty_table.add_row(row['index'], row['shard'], row['node'])
+    for row in empty_shards.head(10).itertuples(index=False):
+        empty_table.add_row(row.index, row.shard, row.node)
 
     dusty_table = Table(title=f"'Polvo de Shards' (< {DUSTY_SHARD_MB_THRESHOLD} MB)")
     dusty_table.add_column("Índice", style="cyan")
     dusty_table.add_column("Tamaño (MB)", justify="right")
     dusty_table.add_column("Docs", justify="right")
     dusty_table.add_column("Nodo", style="magenta")
-    for _, row in dusty_shards.sort_values(by='store').head(10).iterrows():
-        dusty_table.add_row(row['index'], f"{row['store']:.1f}", str(int(row['docs'])), row['node'])
+    for row in dusty_shards.nsmallest(10, 'store').itertuples(index=False):
+        dusty_table.add_row(row.index, f"{row.store:.1f}", str(int(row.docs)), row.node)
 
     console.print(Columns([Panel(empty_table), Panel(dusty_table)]))
     console.print("\n[italic]Los shards vacíos y el 'polvo de shards' consumen memoria heap de forma ineficiente. Considera usar la API `_shrink` o ajustar las políticas de `rollover` e ILM.[/italic]")
@@ -386,7 +485,7 @@ def analyze_configuration_drift(analyzer: ClusterAnalyzer):
         }
     }
     
-    settings_data = analyzer.client.get("_cluster/settings")
+    settings_data = analyzer.cached_get("_cluster/settings", ttl=STATIC_METADATA_TTL_S)
     if not settings_data:
         console.print("[red]No se pudo obtener la configuración del clúster.[/red]")
         return
@@ -438,15 +537,15 @@ def analyze_mapping_explosion(analyzer: ClusterAnalyzer):
     FIELD_COUNT_THRESHOLD = 1000
     
     # Obtenemos solo los índices más grandes para no analizar todo el clúster
-    analyzer.fetch_all_data()
-    indices_df = analyzer.indices_df.copy()
+    analyzer.fetch_all_data(max_age=STATIC_AUDIT_MAX_AGE_S)
+    indices_df = analyzer.indices_df
     
     if indices_df.empty:
         console.print("[yellow]No hay datos de índices para analizar.[/yellow]")
         return
     
     # Analizamos los 20 índices con más documentos
-    top_indices = indices_df.sort_values(by='docs.count', ascending=False).head(20)
+    top_indices = indices_df.nlargest(20, 'docs.count')
     
     table = Table(title="Resultados del Análisis de Mapeo de Campos")
     table.add_column("Índice", style="cyan")
@@ -454,23 +553,15 @@ def analyze_mapping_explosion(analyzer: ClusterAnalyzer):
     table.add_column("Diagnóstico", style="white")
 
     with console.status("[yellow]Analizando mapeos...[/yellow]", spinner="dots"):
-        for _, index_row in top_indices.iterrows():
-            index_name = index_row['index']
-            mapping_data = analyzer.client.get(f"{index_name}/_mapping")
-            
-            field_count = 0
-            # Función recursiva para contar los campos anidados
-            def count_fields(mapping):
-                count = 0
-                if 'properties' in mapping:
-                    props = mapping['properties']
-                    count += len(props)
-                    for field, value in props.items():
-                        count += count_fields(value)
-                return count
+        index_names = top_indices['index'].tolist()
+        # Las peticiones son independientes y dominadas por la latencia de red: se lanzan en paralelo.
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as executor:
+            mappings = executor.map(lambda name: analyzer.cached_get(f"{name}/_mapping", ttl=STATIC_METADATA_TTL_S), index_names)
 
+        for index_name, mapping_data in zip(index_names, mappings):
+            field_count = 0
             if mapping_data and index_name in mapping_data:
-                field_count = count_fields(mapping_data[index_name]['mappings'])
+                field_count = _count_mapping_fields(mapping_data[index_name]['mappings'])
             
             if field_count > FIELD_COUNT_THRESHOLD:
                 style = "bold red"
@@ -496,13 +587,12 @@ def run_causality_chain_analysis(analyzer: ClusterAnalyzer):
     """
     console.print(Rule("[bold]🔗 Diagnóstico por Cadenas de Causalidad[/bold]"))
     
+    sample_interval = 2
     with console.status("[yellow]Ejecutando análisis profundo...[/yellow]", spinner="earth"):
-        analyzer.fetch_all_data()
-        time.sleep(2) # Espera para calcular tasas
-        analyzer.fetch_all_data()
+        analyzer.fetch_rate_sample(sample_interval) # Dos muestras para calcular tasas
 
     # 1. Punto de partida: ¿Hay algún nodo con uso de HEAP OLD GEN muy alto?
-    nodes_df = analyzer.nodes_df.copy()
+    nodes_df = analyzer.nodes_df
     high_heap_nodes = nodes_df[nodes_df['heap_old_gen_percent'] > HEAP_OLD_GEN_THRESHOLD]
     
     if high_heap_nodes.empty:
@@ -512,34 +602,43 @@ def run_causality_chain_analysis(analyzer: ClusterAnalyzer):
         
     console.print(f"Se detectaron [bold red]{len(high_heap_nodes)}[/bold red] nodos con alta presión de memoria. Iniciando análisis de causa raíz...\n")
 
-    for _, node in high_heap_nodes.iterrows():
-        node_name = node['node_name']
+    # Actividad de los shards primarios: se cruza con las tasas una sola vez y se reparte por nodo.
+    # Las tasas ya vienen en `indices_df` (0 sin muestra previa): basta con tener índices y shards.
+    primaries_by_node = {}
+    indices_df = analyzer.indices_df
+    has_activity_data = not analyzer.shards_df.empty and not indices_df.empty
+    if has_activity_data:
+        primary_shards = analyzer.shards_df[analyzer.shards_df['prirep'] == 'p']
+        primary_activity = pd.merge(primary_shards, indices_df[['index', 'write_rate', 'search_rate']], on='index', how='left').fillna({'write_rate': 0, 'search_rate': 0})
+        primaries_by_node = dict(list(primary_activity.groupby('node', observed=True)))
+
+    chain_panels = []
+    for node in high_heap_nodes.itertuples(index=False):
+        node_name = node.node_name
         report = [
             f"Diagnóstico para el nodo: [bold magenta]{node_name}[/bold magenta]",
-            f"  [1] SÍNTOMA: El uso de memoria Heap Old Gen es del [bold red]{node['heap_old_gen_percent']:.1f}%[/bold red], superando el umbral del {HEAP_OLD_GEN_THRESHOLD}%."
+            f"  [1] SÍNTOMA: El uso de memoria Heap Old Gen es del [bold red]{node.heap_old_gen_percent:.1f}%[/bold red], superando el umbral del {HEAP_OLD_GEN_THRESHOLD}%."
         ]
         
         # 2. Investigación: ¿Coincide con actividad alta de Garbage Collection?
-        gc_time = node['gc_time_ms']
+        gc_time = node.gc_time_ms
         if gc_time > GC_TIME_THRESHOLD:
             report.append(f"  [2] CORRELACIÓN: Se observa un tiempo de GC elevado ({gc_time} ms), lo que confirma que el nodo está luchando por liberar memoria.")
         else:
             report.append(f"  [2] CORRELACIÓN: El tiempo de GC no es anormalmente alto, la presión puede ser reciente o constante.")
             
         # 3. Investigación: ¿Qué shards primarios están en este nodo y qué carga tienen?
-        shards_on_node = analyzer.shards_df[analyzer.shards_df['node'] == node_name]
-        primary_shards = shards_on_node[shards_on_node['prirep'] == 'p']
+        primary_shards_activity = primaries_by_node.get(node_name)
         
-        if primary_shards.empty:
+        if not has_activity_data:
+            report.append("  [3] ANÁLISIS DE CARGA: Sin datos de actividad de índices y shards; no se puede atribuir la carga de este nodo.")
+        elif primary_shards_activity is None:
             report.append("  [3] ANÁLISIS DE CARGA: Este nodo no tiene shards primarios. La presión de memoria podría venir de réplicas, búsquedas pesadas o tareas internas.")
         else:
-            indices_with_rates = analyzer.indices_df[['index', 'write_rate', 'search_rate']]
-            primary_shards_activity = pd.merge(primary_shards, indices_with_rates, on='index', how='left').fillna(0)
-            
-            top_writing_shard = primary_shards_activity.sort_values(by='write_rate', ascending=False).iloc[0]
-            top_searching_shard = primary_shards_activity.sort_values(by='search_rate', ascending=False).iloc[0]
+            top_writing_shard = primary_shards_activity.loc[primary_shards_activity['write_rate'].idxmax()]
+            top_searching_shard = primary_shards_activity.loc[primary_shards_activity['search_rate'].idxmax()]
 
-            report.append(f"  [3] ANÁLISIS DE CARGA: El nodo aloja {len(primary_shards)} shards primarios.")
+            report.append(f"  [3] ANÁLISIS DE CARGA: El nodo aloja {len(primary_shards_activity)} shards primarios.")
             if top_writing_shard['write_rate'] > 0:
                  report.append(f"    - El principal contribuyente a la carga de ESCRITURA es el índice [cyan]{top_writing_shard['index']}[/cyan].")
             if top_searching_shard['search_rate'] > 0:
@@ -555,11 +654,13 @@ def run_causality_chain_analysis(analyzer: ClusterAnalyzer):
         conclusion = (
             "HIPÓTESIS: La alta presión de memoria en este nodo es probablemente causada por una combinación de "
             "una alta carga de ingesta/búsqueda en los shards primarios que aloja y el alto consumo de memoria de "
-            f"índices como [cyan]{top_heap_consumer['index']}[/cyan]." if top_heap_consumer else "una alta carga de ingesta/búsqueda en los shards primarios que aloja."
+            f"índices como [cyan]{top_heap_consumer['index']}[/cyan]." if top_heap_consumer is not None else "una alta carga de ingesta/búsqueda en los shards primarios que aloja."
         )
         report.append(f"\n  [bold green]CONCLUSIÓN PRELIMINAR:[/] {conclusion}")
 
-        console.print(Panel("\n".join(report), title=f"[yellow]Cadena de Causalidad - {node_name}[/yellow]", border_style="yellow"))
+        chain_panels.append(Panel("\n".join(report), title=f"[yellow]Cadena de Causalidad - {node_name}[/yellow]", border_style="yellow"))
+
+    console.print(Group(*chain_panels))
 
     Prompt.ask("\n[bold]Presiona Enter para volver al menú...[/bold]")
 
@@ -573,14 +674,16 @@ def analyze_shard_toxicity(analyzer: ClusterAnalyzer):
 
     # Paso 1: Realizar el trabajo pesado DENTRO del bloque de estado
     with console.status("[yellow]Identificando nodos sobrecargados y tareas lentas...[/yellow]"):
-        analyzer.fetch_all_data()
-        nodes_df = analyzer.nodes_df.copy()
+        analyzer.fetch_all_data(for_deep_dive=True, max_age=REFRESH_INTERVAL)  # Solo hacen falta los nodos.
+        nodes_df = analyzer.nodes_df
         high_cpu_nodes = nodes_df[nodes_df['cpu_percent'] > CPU_USAGE_THRESHOLD]
-
-        # Solo obtenemos las tareas si hay nodos con CPU alta
+        # El volcado detallado de `_tasks` es de las lecturas más pesadas: solo se pide si hay nodos con CPU alta,
+        # y limitado a esos nodos, para no cargar un clúster sano.
         tasks_data = None
         if not high_cpu_nodes.empty:
-            tasks_data = analyzer.client.get("_tasks", params={'actions': '*search*', 'detailed': 'true'})
+            tasks_data = analyzer.cached_get("_tasks", params={
+                'actions': '*search*', 'detailed': 'true', 'nodes': ','.join(high_cpu_nodes['node_id']),
+            })
 
     # Paso 2: Ahora que el spinner desapareció, mostramos los resultados
     if high_cpu_nodes.empty:
@@ -592,45 +695,24 @@ def analyze_shard_toxicity(analyzer: ClusterAnalyzer):
         console.print("[red]Se detectaron nodos con CPU alta, pero no se pudo obtener la información de las tareas.[/red]")
         return
 
-    toxic_tenants = []
-
     # Paso 3: Correlacionar los datos obtenidos
-    for _, node in high_cpu_nodes.iterrows():
-        node_name = node['node_name']
-        node_id = node['node_id']
-
-        if node_id not in tasks_data.get('nodes', {}):
-            continue
-
-        for task_id, task_info in tasks_data['nodes'][node_id]['tasks'].items():
-            description = task_info.get('description', '')
-            tenant_id = "No Extraído"
-            try:
-                if 'body:' in description:
-                    query_body_str = description.split('body:')[1].strip()
-                    query_body = json.loads(query_body_str)
-                    if 'term' in query_body.get('query', {}).get('bool', {}).get('filter', [{}])[0]:
-                       term_filter = query_body['query']['bool']['filter'][0]['term']
-                       for key, value in term_filter.items():
-                           if 'customer_id' in key or 'tenant_id' in key:
-                               tenant_id = str(value)
-                               break
-            except (json.JSONDecodeError, IndexError, KeyError):
-                pass
-
-            toxic_tenants.append({
-                "node_name": node_name,
-                "cpu": node['cpu_percent'],
-                "running_time_s": task_info.get('running_time_in_nanos', 0) / 1e9,
-                "tenant_id": tenant_id,
-                "description": description
-            })
-
-    if not toxic_tenants:
+    tasks_df = pd.DataFrame(
+        [(node_id, task.get('description', ''), task.get('running_time_in_nanos', 0))
+         for node_id, node_tasks in tasks_data['nodes'].items()
+         for task in node_tasks.get('tasks', {}).values()],
+        columns=['node_id', 'description', 'running_time_in_nanos'],
+    )
+    toxic_tenants = high_cpu_nodes[['node_id', 'node_name', 'cpu_percent']].merge(tasks_df, on='node_id')
+
+    if toxic_tenants.empty:
         console.print("[green]✅ Se detectaron nodos con CPU alta, pero no hay tareas de búsqueda lenta asociadas que puedan ser la causa.[/green]")
         Prompt.ask("\n[bold]Presiona Enter para volver al menú...[/bold]")
         return
 
+    toxic_tenants['tenant_id'] = toxic_tenants['description'].str.extract(_TENANT_RE, expand=False).fillna("No Extraído")
+    toxic_tenants['running_time_s'] = toxic_tenants['running_time_in_nanos'] / 1e9
+    toxic_tenants.sort_values('running_time_s', ascending=False, inplace=True)
+
     table = Table(title="Resultados del Análisis de Inquilinos Tóxicos")
     table.add_column("Nodo Afectado", style="magenta")
     table.add_column("CPU%", justify="right", style="red")
@@ -638,13 +720,13 @@ def analyze_shard_toxicity(analyzer: ClusterAnalyzer):
     table.add_column("Tiempo Tarea (s)", justify="right")
     table.add_column("Descripción de la Consulta", max_width=80)
 
-    for tenant in sorted(toxic_tenants, key=lambda x: x['running_time_s'], reverse=True):
+    for tenant in toxic_tenants.itertuples(index=False):
         table.add_row(
-            tenant['node_name'],
-            f"{tenant['cpu']:.0f}%",
-            tenant['tenant_id'],
-            f"{tenant['running_time_s']:.1f}",
-            tenant['description']
+            tenant.node_name,
+            f"{tenant.cpu_percent:.0f}%",
+            tenant.tenant_id,
+            f"{tenant.running_time_s:.1f}",
+            tenant.description
         )
 
     console.print(table)
@@ -1,11 +1,113 @@
 # src/analyzer.py
 import time
 import os
-import re
 import logging
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import pyarrow  # noqa: F401  (motor de `to_parquet`)
+    _SNAPSHOT_FORMAT = 'parquet'
+except ImportError:  # pyarrow es opcional: sin él los snapshots se siguen guardando en JSON.
+    _SNAPSHOT_FORMAT = 'json'
 from .client import ElasticsearchClient
-from .config import SNAPSHOT_DIR, SNAPSHOT_INTERVAL_S, SNAPSHOT_RETENTION_DAYS
+from .config import SNAPSHOT_DIR, SNAPSHOT_INTERVAL_S, SNAPSHOT_RETENTION_DAYS, REFRESH_INTERVAL, MAX_PARALLEL_REQUESTS, NODES_INFO_TTL_S
+
+# Columnas numéricas que la API `_cat` devuelve como texto. Son conteos y tamaños enteros (`bytes=mb`).
+_CAT_NUMERIC_COLUMNS = ('docs', 'store', 'docs.count', 'store.size')
+
+def _coerce_cat_numerics(df):
+    """Convierte una sola vez las columnas numéricas de `_cat` al entero más pequeño que las representa.
+
+    Mismo criterio que `_downcast_numerics`: solo se reducen enteros; un valor no entero se queda en float64.
+    """
+    for col in _CAT_NUMERIC_COLUMNS:
+        if col in df:
+            df[col] = pd.to_numeric(pd.to_numeric(df[col], errors='coerce').fillna(0), downcast='integer')
+    return df
+
+# Columnas de `_cat/shards` con pocos valores distintos; como categóricas se comparan por código entero.
+_SHARD_CATEGORICAL_COLUMNS = ('node', 'prirep', 'state')
+
+# Prefijos y extensiones de los snapshots propios; la retención se decide por la fecha de modificación del fichero
+# y solo toca ficheros con ambos, para no borrar nada ajeno que haya en el directorio.
+_SNAPSHOT_PREFIXES = ('nodes_', 'indices_')
+_SNAPSHOT_SUFFIXES = ('.json', '.parquet')
+
+# Columnas de texto de baja cardinalidad en nodos e índices.
+_NODE_CATEGORICAL_COLUMNS = ('tier',)
+_INDEX_CATEGORICAL_COLUMNS = ('health', 'status')
+
+def _downcast_numerics(df):
+    """Reduce las columnas enteras al tipo más pequeño sin pérdida (con signo, para restar contadores).
+
+    Las columnas de coma flotante se quedan en float64: pasarlas a float32 solo sería aproximadamente exacto.
+    """
+    for col in df.select_dtypes('number').columns:
+        downcast = pd.to_numeric(df[col], downcast='integer')
+        if downcast.dtype.kind in 'iu':
+            df[col] = downcast
+    return df
+
+def _categorize(df, columns):
+    for col in columns:
+        if col in df:
+            df[col] = df[col].astype('category')
+    return df
+
+def _index_rates(indices_df, previous_indices_df, time_delta):
+    """Tasas de escritura y búsqueda por índice (docs/s, req/s) entre dos muestras de `indices_df`.
+
+    Ambos contadores se restan y dividen en una sola operación sobre una matriz (N, 2). Los índices sin
+    muestra previa tienen tasa 0. Devuelve `(write_rate, search_rate)` alineados con `indices_df`.
+    """
+    counters = ['indexing_total', 'search_total']
+    current = indices_df[counters].to_numpy(dtype='float64')
+    if previous_indices_df.empty:
+        return np.zeros_like(current).T
+    previous = previous_indices_df.drop_duplicates('index').set_index('index')[counters].reindex(indices_df['index'].to_numpy()).to_numpy(dtype='float64')
+    previous = np.where(np.isnan(previous), current, previous)
+    return ((current - previous) / time_delta).T
+
+def _column(df, name, default):
+    """Columna aplanada de `json_normalize`, o el valor por defecto si ningún nodo la reporta."""
+    return df[name].fillna(default) if name in df else default
+
+def _build_nodes_df(nodes_stats, nodes_info):
+    """Aplana `_nodes/stats` de una sola pasada y calcula las métricas por nodo con operaciones de columna."""
+    if not nodes_stats:
+        return pd.DataFrame()
+    raw = pd.json_normalize(list(nodes_stats.values()))
+    node_ids = list(nodes_stats)
+    tiers = [
+        next((v for k, v in nodes_info.get(node_id, {}).get('attributes', {}).items() if 'tier' in k), 'undefined')
+        for node_id in node_ids
+    ]
+    # Un máximo de 0 (o ausente) no permite calcular el porcentaje: queda en NaN y luego en 0%, sin generar alerta.
+    old_gen_max = _column(raw, 'jvm.mem.pools.old.max_in_bytes', np.nan)
+    if isinstance(old_gen_max, pd.Series):
+        old_gen_max = old_gen_max.replace(0, np.nan)
+    return pd.DataFrame({
+        'node_id': node_ids,
+        'node_name': _column(raw, 'name', 'N/A'),
+        'tier': tiers,
+        'cpu_percent': _column(raw, 'os.cpu.percent', 0),
+        'heap_percent': _column(raw, 'jvm.mem.heap_used_percent', 0),
+        'heap_old_gen_percent': np.nan_to_num(_column(raw, 'jvm.mem.pools.old.used_in_bytes', 0) / old_gen_max * 100),
+        'gc_count': _column(raw, 'jvm.gc.collectors.old.collection_count', 0),
+        'gc_time_ms': _column(raw, 'jvm.gc.collectors.old.collection_time_in_millis', 0),
+        'breakers_tripped': raw.filter(regex=r'^breaker\.[^.]+\.tripped$').sum(axis=1),
+        'rejections': raw.filter(regex=r'^thread_pool\.[^.]+\.rejected$').sum(axis=1),
+    })
+
+# Endpoints de la captura. Son independientes entre sí, así que se piden en paralelo.
+_NODES_INFO_PATH = "_nodes/_all/info/name,roles,attributes"
+_CAT_INDICES_PATH = "_cat/indices?format=json&bytes=mb&h=health,status,index,uuid,pri,rep,docs.count,store.size"
+_CAT_SHARDS_PATH = "_cat/shards?format=json&bytes=mb&h=index,shard,prirep,state,docs,store,ip,node"
+_NODE_STATS_PATH = "_nodes/stats/jvm,fs,os,process,thread_pool,transport,breaker"
+_INDEX_STATS_PATH = "_stats/indexing,search,segments,query_cache,fielddata"
+# Endpoints casi estáticos que se sirven desde `cached_get` con su propio TTL.
+_CACHED_PATH_TTLS = {_NODES_INFO_PATH: NODES_INFO_TTL_S}
 
 class ClusterAnalyzer:
     """Orquesta la recolección, análisis y visualización de datos del clúster."""
@@ -13,62 +115,158 @@ class ClusterAnalyzer:
         self.client = client
         self.nodes_df = pd.DataFrame()
         self.indices_df = pd.DataFrame()
-        self.shards_df = pd.DataFrame()
         self.previous_nodes_df = pd.DataFrame()
         self.previous_indices_df = pd.DataFrame()
         self.node_stats_raw = {}
         self.previous_node_stats_raw = {}
         self.cluster_stats = {}
+        self.heap_pct = 0.0
         self.cluster_health = {}
         self.pending_tasks = {}
         self.last_fetch_time = None
+        self._indices_fetch_time = None
         self.last_snapshot_time = 0
         self.top_heap_indices = pd.DataFrame()
+        self._response_cache = {}
+        self._shards_raw = None
+        self._shards_df = None
+        self._nodes_info = {}
+        self._cat_indices_df = pd.DataFrame()
+        self._last_full_fetch = None
+
+    @property
+    def shards_df(self):
+        """`_cat/shards` como DataFrame, construido en el primer acceso tras cada cambio de la respuesta."""
+        if self._shards_df is None:
+            self._shards_df = _categorize(_coerce_cat_numerics(pd.DataFrame(self._shards_raw or [])), _SHARD_CATEGORICAL_COLUMNS)
+        return self._shards_df
 
     def _manage_snapshots(self, current_time):
         os.makedirs(SNAPSHOT_DIR, exist_ok=True)
         if (current_time - self.last_snapshot_time) > SNAPSHOT_INTERVAL_S:
             timestamp_str = int(current_time)
-            if not self.nodes_df.empty:
-                self.nodes_df.to_json(f"{SNAPSHOT_DIR}/nodes_{timestamp_str}.json", orient='split')
-            if not self.indices_df.empty:
-                self.indices_df.to_json(f"{SNAPSHOT_DIR}/indices_{timestamp_str}.json", orient='split')
+            for name, df in (('nodes', self.nodes_df), ('indices', self.indices_df)):
+                if df.empty:
+                    continue
+                path = f"{SNAPSHOT_DIR}/{name}_{timestamp_str}.{_SNAPSHOT_FORMAT}"
+                if _SNAPSHOT_FORMAT == 'parquet':
+                    df.to_parquet(path, compression='zstd', index=False)
+                else:
+                    df.to_json(path, orient='split')
             self.last_snapshot_time = current_time
             logging.info(f"Snapshot guardado en t={timestamp_str}")
 
         retention_limit = current_time - (SNAPSHOT_RETENTION_DAYS * 24 * 60 * 60)
-        for filename in os.listdir(SNAPSHOT_DIR):
-            try:
-                timestamp = int(re.search(r'_(\d+)\.json', filename).group(1))
-                if timestamp < retention_limit:
-                    os.remove(os.path.join(SNAPSHOT_DIR, filename))
-                    logging.info(f"Snapshot antiguo purgado: {filename}")
-            except (AttributeError, ValueError):
-                continue
-
-    def fetch_all_data(self, for_deep_dive=False):
+        with os.scandir(SNAPSHOT_DIR) as entries:
+            for entry in entries:
+                if entry.name.startswith(_SNAPSHOT_PREFIXES) and entry.name.endswith(_SNAPSHOT_SUFFIXES) \
+                        and entry.stat(follow_symlinks=False).st_mtime < retention_limit:
+                    os.unlink(entry.path)
+                    logging.info(f"Snapshot antiguo purgado: {entry.name}")
+
+    def cached_get(self, path, params=None, ttl=REFRESH_INTERVAL):
+        """GET memoizado durante `ttl` segundos, para que análisis consecutivos compartan la misma respuesta."""
+        key = (path, tuple(sorted(params.items())) if params else ())
+        now = time.monotonic()
+        hit = self._response_cache.get(key)
+        if hit and now - hit[0] < ttl:
+            return hit[1]
+        response = self.client.get(path, params=params)
+        if response is not None:
+            self._response_cache[key] = (now, response)
+        return response
+
+    def fetch_rate_sample(self, interval):
+        """Toma dos muestras separadas `interval` segundos (de inicio a inicio) para poder calcular tasas.
+
+        La espera descuenta lo que tardó la primera captura, de modo que la latencia de la red
+        se solapa con la ventana de muestreo en lugar de sumarse a ella.
+        """
+        start = time.monotonic()
+        self.fetch_all_data()
+        time.sleep(max(0, interval - (time.monotonic() - start)))
+        self.fetch_counters()
+
+    def _get_many(self, paths):
+        """Lanza varios GET independientes en paralelo y devuelve las respuestas en el mismo orden."""
+        def get(path):
+            ttl = _CACHED_PATH_TTLS.get(path)
+            return self.cached_get(path, ttl=ttl) if ttl else self.client.get(path)
+
+        with ThreadPoolExecutor(max_workers=min(len(paths), MAX_PARALLEL_REQUESTS)) as executor:
+            return list(executor.map(get, paths))
+
+    @staticmethod
+    def _counter_paths(for_deep_dive):
+        return [_NODE_STATS_PATH] if for_deep_dive else [_NODE_STATS_PATH, _INDEX_STATS_PATH]
+
+    def fetch_all_data(self, for_deep_dive=False, max_age=0):
+        """Captura completa: topología del clúster (nodos, índices, shards, salud) más los contadores.
+
+        Todas las peticiones salen en una sola tanda concurrente; el procesado posterior es secuencial.
+        Con `for_deep_dive` solo se piden los endpoints de nodos, para quien no necesita índices ni shards.
+        Con `max_age` se reutiliza la última captura completa (que cubre ambos casos) si tiene menos de esos segundos.
+        """
+        if max_age and self._last_full_fetch is not None \
+                and time.monotonic() - self._last_full_fetch < max_age:
+            return
+        topology_paths = [_NODES_INFO_PATH]
+        if not for_deep_dive:
+            topology_paths += [_CAT_INDICES_PATH, _CAT_SHARDS_PATH, "_cluster/stats", "_cluster/health", "_cluster/pending_tasks"]
+        responses = self._get_many(topology_paths + self._counter_paths(for_deep_dive))
+        topology, counters = responses[:len(topology_paths)], responses[len(topology_paths):]
+
+        self._nodes_info = topology[0] or {}
+        
+        if not for_deep_dive:
+            cat_indices_raw, shards_raw, cluster_stats, cluster_health, pending_tasks = topology[1:]
+            cat_indices_raw = cat_indices_raw or []
+            shards_raw = shards_raw or []
+            if shards_raw != self._shards_raw:
+                # Solo se invalida el DataFrame cuando la respuesta cambia, así los consumidores pueden cachear por identidad.
+                self._shards_raw = shards_raw
+                self._shards_df = None
+            self.cluster_stats = cluster_stats or {}
+            # Heap total del clúster, calculado una vez por captura en lugar de en cada redibujado de la cabecera.
+            jvm_mem = self.cluster_stats.get('nodes', {}).get('jvm', {}).get('mem', {})
+            self.heap_pct = jvm_mem.get('heap_used_in_bytes', 0) / (jvm_mem.get('heap_max_in_bytes') or 1) * 100
+            self.cluster_health = cluster_health or {}
+            self.pending_tasks = pending_tasks or {}
+            
+            cat_df = pd.DataFrame(cat_indices_raw)
+            if 'status' in cat_df:
+                cat_df = cat_df[cat_df['status'] == 'open'].reset_index(drop=True)
+            self._cat_indices_df = _coerce_cat_numerics(cat_df)
+
+        self._apply_counters(for_deep_dive, *counters)
+        if not for_deep_dive:
+            self._last_full_fetch = time.monotonic()
+
+    def fetch_counters(self, for_deep_dive=False):
+        """Refresca solo los contadores (stats de nodos e índices) sobre la topología de la última captura completa.
+
+        Es la segunda muestra de `fetch_rate_sample`: la topología no cambia de forma relevante en la ventana.
+        """
+        self._apply_counters(for_deep_dive, *self._get_many(self._counter_paths(for_deep_dive)))
+
+    def _apply_counters(self, for_deep_dive, node_stats_raw, index_stats_raw=None):
+        """Construye `nodes_df`/`indices_df` a partir de las respuestas de stats ya descargadas."""
         current_time = time.time()
         self.last_fetch_time = current_time
 
+        # Basta con reasignar: los frames y la respuesta cruda se reconstruyen en cada captura, nunca se mutan in situ.
         if not self.nodes_df.empty:
-            self.previous_nodes_df = self.nodes_df.copy()
+            self.previous_nodes_df = self.nodes_df
         if not self.indices_df.empty:
-            self.previous_indices_df = self.indices_df.copy()
+            self.previous_indices_df = self.indices_df
         if self.node_stats_raw:
-            self.previous_node_stats_raw = self.node_stats_raw.copy()
+            self.previous_node_stats_raw = self.node_stats_raw
 
-        self.node_stats_raw = self.client.get("_nodes/stats/jvm,fs,os,process,thread_pool,transport,breaker") or {}
-        nodes_info = self.client.get("_nodes/_all/info/name,roles,attributes") or {}
+        self.node_stats_raw = node_stats_raw or {}
         
         if not for_deep_dive:
-            index_stats_raw = self.client.get("_stats/indexing,search,segments,query_cache,fielddata") or {}
-            cat_indices_raw = self.client.get("_cat/indices?format=json&bytes=mb&h=health,status,index,uuid,pri,rep,docs.count,store.size") or []
-            self.shards_df = pd.DataFrame(self.client.get("_cat/shards?format=json&bytes=mb&h=index,shard,prirep,state,docs,store,ip,node") or [])
-            self.cluster_stats = self.client.get("_cluster/stats") or {}
-            self.cluster_health = self.client.get("_cluster/health") or {}
-            self.pending_tasks = self.client.get("_cluster/pending_tasks") or {}
-            
-            cat_df = pd.DataFrame([i for i in cat_indices_raw if i.get('status') == 'open'])
+            index_stats_raw = index_stats_raw or {}
+            cat_df = self._cat_indices_df
             stats_list = []
             if 'indices' in index_stats_raw:
                 for index_name, stats in index_stats_raw.get('indices', {}).items():
@@ -86,38 +284,22 @@ class ClusterAnalyzer:
             if not cat_df.empty and not stats_df.empty:
                 self.indices_df = pd.merge(cat_df, stats_df, on='index', how='inner')
                 self.indices_df['heap_usage_mb'] = self.indices_df['memory_segments_mb'] + self.indices_df['memory_cache_mb'] + self.indices_df['memory_fielddata_mb']
-                self.top_heap_indices = self.indices_df.sort_values('heap_usage_mb', ascending=False).head(5)
+                self.indices_df = _categorize(_downcast_numerics(self.indices_df), _INDEX_CATEGORICAL_COLUMNS)
+                # Las tasas se calculan aquí una vez por captura, con el intervalo real entre muestras, para todos los consumidores.
+                time_delta = current_time - self._indices_fetch_time if self._indices_fetch_time else REFRESH_INTERVAL
+                write_rate, search_rate = _index_rates(self.indices_df, self.previous_indices_df, time_delta or REFRESH_INTERVAL)
+                self.indices_df['write_rate'] = write_rate
+                self.indices_df['search_rate'] = search_rate
+                self._indices_fetch_time = current_time
+                self.top_heap_indices = self.indices_df.nlargest(5, 'heap_usage_mb')
             else:
                 self.indices_df = pd.DataFrame() # Ensure it is an empty DataFrame
                 self.top_heap_indices = pd.DataFrame()
 
-        node_list = []
-        if 'nodes' in self.node_stats_raw:
-            for node_id, data in self.node_stats_raw.get('nodes', {}).items():
-                jvm_mem = data.get('jvm', {}).get('mem', {})
-                old_gen = jvm_mem.get('pools', {}).get('old', {})
-                heap_old_gen_percent = (old_gen.get('used_in_bytes', 0) / old_gen.get('max_in_bytes', 1) * 100)
-                gc_info = data.get('jvm', {}).get('gc', {}).get('collectors', {}).get('old', {})
-                
-                node_info = nodes_info.get('nodes', {}).get(node_id, {})
-                node_attributes = node_info.get('attributes', {})
-                tier = next((v for k, v in node_attributes.items() if 'tier' in k), 'undefined')
-                
-                rejections = sum(pool.get('rejected', 0) for pool in data.get('thread_pool', {}).values())
-
-                node_list.append({
-                    'node_id': node_id,
-                    'node_name': data.get('name', 'N/A'),
-                    'tier': tier,
-                    'cpu_percent': data.get('os', {}).get('cpu', {}).get('percent', 0),
-                    'heap_percent': jvm_mem.get('heap_used_percent', 0),
-                    'heap_old_gen_percent': heap_old_gen_percent,
-                    'gc_count': gc_info.get('collection_count', 0),
-                    'gc_time_ms': gc_info.get('collection_time_in_millis', 0),
-                    'breakers_tripped': sum(b.get('tripped', 0) for b in data.get('breaker', {}).values()),
-                    'rejections': rejections
-                })
-        self.nodes_df = pd.DataFrame(node_list)
+        self.nodes_df = _categorize(
+            _downcast_numerics(_build_nodes_df(self.node_stats_raw.get('nodes', {}), self._nodes_info.get('nodes', {}))),
+            _NODE_CATEGORICAL_COLUMNS,
+        )
         
         if not for_deep_dive:
             self._manage_snapshots(current_time)
\ No newline at end of file
@@ -1,8 +1,16 @@
 # src/client.py
+import time
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson es opcional: sin él se usa el parser de la librería estándar.
+    from json import loads as _json_loads
 from rich.console import Console
-from .config import HEADERS
+from .config import (
+    HEADERS, MAX_PARALLEL_REQUESTS, CONNECTION_RETRY_DELAYS_S, CONNECTION_CHECK_TIMEOUT_S, REQUEST_TIMEOUT_S
+)
 
 console = Console()
 
@@ -12,15 +20,47 @@ class ElasticsearchClient:
         self.base_url = host
         self.auth = (user, password) if user else None
         self.verify_ssl = verify_ssl
+        self.session = self._build_session()
         self.cluster_info = self._check_connection()
 
+    def _build_session(self):
+        """Sesión compartida que reutiliza conexiones keep-alive en las peticiones paralelas.
+
+        requests no garantiza que `Session` sea segura entre hilos: aquí lo es solo porque se configura
+        por completo al construirla y no se modifica después. Las cabeceras, auth o parámetros propios
+        de una petición deben pasarse como argumentos de `get`, nunca mutando la sesión desde los hilos.
+        """
+        session = requests.Session()
+        # pool_block: si hay más hilos que conexiones, esperan una libre en vez de abrir (y tirar) otra con su handshake TLS.
+        adapter = HTTPAdapter(pool_connections=MAX_PARALLEL_REQUESTS, pool_maxsize=MAX_PARALLEL_REQUESTS, pool_block=True)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.auth = self.auth
+        session.verify = self.verify_ssl
+        session.headers.update(HEADERS)
+        return session
+
+    def close(self):
+        """Cierra las conexiones keep-alive del pool."""
+        self.session.close()
+
     def _check_connection(self):
         if not self.base_url:
             logging.error("La variable de entorno ES_HOST no está configurada.")
             console.print("[bold red]❌ Error: La variable de entorno ES_HOST no está configurada.[/bold red]")
             return None
         try:
-            info = self.get("/")
+            # Un clúster que aún arranca suele responder en pocos cientos de ms: se reintenta con espera creciente,
+            # pero solo ante fallos de red. Un 401/403 o una respuesta inválida no mejoran reintentando.
+            for delay in (*CONNECTION_RETRY_DELAYS_S, None):
+                try:
+                    info = self._get_json("/", timeout=CONNECTION_CHECK_TIMEOUT_S)
+                    break
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if delay is None:
+                        raise
+                    logging.warning(f"Elasticsearch no responde ({e}); reintentando en {delay}s.")
+                    time.sleep(delay)
             if info:
                 logging.info(f"Conectado a Elasticsearch. Cluster: {info.get('cluster_name')}, Versión: {info.get('version', {}).get('number')}")
                 console.print(f"[bold green]✔ Conectado a Elasticsearch[/bold green] | Cluster: [cyan]{info.get('cluster_name')}[/cyan] | Versión: [cyan]{info.get('version', {}).get('number')}[/cyan]")
@@ -32,12 +72,19 @@ class ElasticsearchClient:
             console.print(f"[bold red]❌ No se pudo conectar a Elasticsearch:[/bold red] {e}")
             return None
 
-    def get(self, path, params=None):
+    def _get_json(self, path, params=None, timeout=REQUEST_TIMEOUT_S):
+        """GET que devuelve el JSON decodificado y deja propagar los errores de red, HTTP y de formato."""
+        response = self.session.get(f"{self.base_url}/{path}", params=params, timeout=timeout)
+        response.raise_for_status()
+        return _json_loads(response.content) if response.content else {}
+
+    def get(self, path, params=None, timeout=REQUEST_TIMEOUT_S):
         url = f"{self.base_url}/{path}"
         try:
-            response = requests.get(url, auth=self.auth, verify=self.verify_ssl, headers=HEADERS, params=params)
-            response.raise_for_status()
-            return response.json()
+            return self._get_json(path, params=params, timeout=timeout)
         except requests.exceptions.RequestException as e:
             logging.warning(f"Fallo en petición GET a {url}: {e}")
+            return None
+        except ValueError as e:
+            logging.warning(f"Respuesta no válida en petición GET a {url}: {e}")
             return None
\ No newline at end of file
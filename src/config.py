@@ -21,6 +21,7 @@ ES_HOST = os.getenv("ES_HOST")
 ES_USER = os.getenv("ES_USER")
 ES_PASS = os.getenv("ES_PASS")
 VERIFY_SSL = False
+# Sin Accept-Encoding propio: el de requests/urllib3 ya pide gzip/deflate (y br/zstd si están instalados).
 HEADERS = {'Content-Type': 'application/json'}
 
 # --- Parámetros de la Herramienta ---
@@ -28,6 +29,13 @@ REFRESH_INTERVAL = 5
 SNAPSHOT_DIR = "snapshots"
 SNAPSHOT_INTERVAL_S = 300
 SNAPSHOT_RETENTION_DAYS = 7
+MAX_PARALLEL_REQUESTS = 10
+CONNECTION_RETRY_DELAYS_S = (0.2, 0.5, 1.0)  # Esperas entre reintentos de la comprobación de conexión inicial.
+CONNECTION_CHECK_TIMEOUT_S = 2  # Timeout de cada intento de la comprobación inicial: un host inalcanzable falla rápido.
+REQUEST_TIMEOUT_S = (3.05, 30)  # (conexión, lectura) de cada GET: ninguna petición del pool bloquea un hilo indefinidamente.
+STATIC_METADATA_TTL_S = 300  # Plantillas y settings del clúster: cambian a escala humana.
+NODES_INFO_TTL_S = 60  # Topología de nodos (nombres, roles, atributos): cambia en minutos, no en segundos.
+STATIC_AUDIT_MAX_AGE_S = 30  # Auditorías de metadatos (plantillas, mapeos): toleran una captura de hace medio minuto.
 
 # --- Umbrales de Diagnóstico ---
 HEAP_USAGE_THRESHOLD = 85
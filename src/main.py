@@ -5,15 +5,15 @@ import rich
 from rich.console import Console
 from rich.prompt import Prompt
 from rich.rule import Rule
+from rich.text import Text
 
 # Importamos los componentes desde nuestra nueva estructura en 'src'
+# El analizador, el renderer y los análisis (pandas, numpy) se importan al usarlos: así `--help`
+# o un fallo de conexión no pagan su carga.
 from src.client import ElasticsearchClient
-from src.analyzer import ClusterAnalyzer
-from src.renderer import render_historical_report, render_actionable_suggestions_markdown
-import src.analysis as analysis
 from src.config import ES_HOST, ES_USER, ES_PASS, VERIFY_SSL
 
-console = Console(record=True)
+console = Console()
 
 def main():
     """Función principal que muestra el menú y controla el flujo."""
@@ -21,11 +21,16 @@ def main():
     
     # Inicializa el cliente y el analizador
     client = ElasticsearchClient(ES_HOST, ES_USER, ES_PASS, VERIFY_SSL)
-    if not client.cluster_info:
-        return
+    try:
+        if client.cluster_info:
+            from src.analyzer import ClusterAnalyzer
+            _run_menu(ClusterAnalyzer(client))
+    finally:
+        client.close()
 
-    analyzer = ClusterAnalyzer(client)
-    
+def _run_menu(analyzer):
+    """Bucle del menú principal; todas las opciones comparten el mismo analizador (y su pool de conexiones)."""
+    import src.analysis as analysis
     menu_options = {
     "1": ("📈 Dashboard General en Vivo", analysis.run_live_dashboard),
     "2": ("🔬 Dashboard de Causa Raíz (Nodos)", analysis.analyze_node_deep_dive),
@@ -41,13 +46,15 @@ def main():
     "11": ("☣️ Análisis de Toxicidad de Shards", analysis.analyze_shard_toxicity),
     "salir": ("🚪 Salir", lambda analyzer: None)
 }
+    # El menú no cambia entre vueltas: su texto y las opciones válidas se construyen una sola vez.
+    menu_text = Text.from_markup("\n".join(f"[bold]{key}[/bold]: {desc}" for key, (desc, _) in menu_options.items()))
+    choices = list(menu_options)
     
     while True:
         console.rule("[bold cyan]Menú Principal de Análisis Experto[/bold cyan]")
-        for key, (desc, _) in menu_options.items():
-            console.print(f"[bold]{key}[/bold]: {desc}")
+        console.print(menu_text)
         
-        main_option = Prompt.ask("\n[bold]Elige una opción[/bold]", choices=list(menu_options.keys()), default="1")
+        main_option = Prompt.ask("\n[bold]Elige una opción[/bold]", choices=choices, default="1")
         
         if main_option == "salir":
             console.print("[bold red]Saliendo del sistema...[/bold red]")
@@ -68,13 +75,14 @@ if __name__ == "__main__":
     if args.report:
         client = ElasticsearchClient(ES_HOST, ES_USER, ES_PASS, VERIFY_SSL)
         if client.cluster_info:
+            from src.analyzer import ClusterAnalyzer
+            from src.renderer import render_actionable_suggestions_markdown
             analyzer = ClusterAnalyzer(client)
-            # Fetch de datos con un pequeño delay para asegurar tasas
-            analyzer.fetch_all_data()
-            time.sleep(2) 
-            analyzer.fetch_all_data()
+            # Dos muestras separadas por un pequeño intervalo para asegurar tasas
+            analyzer.fetch_rate_sample(2)
 
             render_actionable_suggestions_markdown(analyzer)
+        client.close()
     else:
         try:
             main()
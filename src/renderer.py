@@ -1,4 +1,6 @@
 # src/renderer.py
+import functools
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from rich.console import Console
@@ -11,48 +13,88 @@ from rich.text import Text
 
 from .config import (
     HEAP_OLD_GEN_THRESHOLD, CPU_USAGE_THRESHOLD, GC_TIME_THRESHOLD,
-    GC_COUNT_SPIKE_THRESHOLD, GC_TIME_SPIKE_THRESHOLD, REFRESH_INTERVAL
+    GC_COUNT_SPIKE_THRESHOLD, GC_TIME_SPIKE_THRESHOLD
 )
 
-console = Console()
+# Esta consola solo emite el reporte en texto plano: sin resaltado automático ni cortes de línea que rompan el Markdown.
+console = Console(highlight=False, soft_wrap=True)
+
+# Métricas de nodo que la tabla de salud compara contra la muestra anterior.
+_NODE_DELTA_COLUMNS = ('cpu_percent', 'heap_percent', 'heap_old_gen_percent', 'gc_count', 'gc_time_ms', 'rejections')
+
+# Esquemas de las tablas del dashboard: (cabecera, opciones de columna). Se definen una vez y se aplican en cada frame.
+_RIGHT = {'justify': 'right'}
+_NODE_HEALTH_COLUMNS = (
+    ("Tier", {'style': 'magenta'}), ("Nodo", {'style': 'cyan', 'no_wrap': True}), ("CPU%", _RIGHT),
+    ("Heap%", _RIGHT), ("Heap Old%", _RIGHT), ("GC (c/t ms)", _RIGHT), ("Rechazos", _RIGHT),
+)
+_TOP_WRITERS_COLUMNS = (("Índice", {}), ("docs/s", _RIGHT))
+_TOP_SEARCHERS_COLUMNS = (("Índice", {}), ("req/s", _RIGHT))
+_TOP_HEAP_COLUMNS = (("Índice", {}), ("Total (MB)", _RIGHT), ("Seg/Cache/Field", _RIGHT))
+_THREAD_POOL_COLUMNS = (("Pool", {'style': 'cyan'}), ("Activas", _RIGHT), ("En Cola", _RIGHT), ("Rechazadas", _RIGHT))
+_BREAKER_COLUMNS = (("Breaker", {'style': 'cyan'}), ("Límite (MB)", _RIGHT), ("Usado (MB)", _RIGHT), ("Tripped", _RIGHT))
+
+_STATUS_COLORS = {"GREEN": "green", "YELLOW": "yellow", "RED": "red"}
+
+_IDLE_THREAD_POOL_PANEL = Panel("[dim]Sin actividad[/dim]", title="[b]🏊 Thread Pools[/b]")
+
+def _build_table(title, columns):
+    table = Table(title=title, expand=True)
+    for header, options in columns:
+        table.add_column(header, **options)
+    return table
+
+# Color de cada tier; el valor del atributo puede llevar prefijo (p. ej. `data_hot`), así que se busca por fragmento.
+_TIER_COLORS = {'hot': 'yellow', 'warm': 'blue', 'cold': 'cyan', 'frozen': 'magenta'}
+
+@functools.lru_cache(maxsize=16)
+def _tier_markup(tier):
+    """Etiqueta coloreada del tier; se construye una vez por valor distinto y se reutiliza en todos los frames."""
+    color = next((color for key, color in _TIER_COLORS.items() if key in tier), 'blue')
+    return f"[{color}]{tier}[/]"
+
+@functools.lru_cache(maxsize=1)
+def _clock_str(second):
+    """Hora de la captura mostrada en la cabecera; se formatea una sola vez por segundo distinto."""
+    return datetime.fromtimestamp(second).strftime('%H:%M:%S')
+
+@functools.lru_cache(maxsize=64)
+def _sorted_names(names):
+    """Orden alfabético de los pools/breakers de un nodo; el conjunto de nombres es estable entre refrescos."""
+    return tuple(sorted(names))
 
 # --- Funciones de formato de métricas ---
-def _format_metric(current_val, prev_val, spike_threshold, higher_is_worse=True):
-    spike_icon = ""
-    prev_val_for_delta = prev_val if pd.notna(prev_val) else current_val
-    delta = current_val - prev_val_for_delta
-
-    if abs(delta) > spike_threshold:
-        spike_icon = "🔥"
-
-    if pd.isna(prev_val) or current_val == prev_val:
-        arrow, color = " ", "white"
-    elif current_val > prev_val:
-        arrow, color = "🔼", "red" if higher_is_worse else "green"
-    else:
-        arrow, color = "🔽", "green" if higher_is_worse else "red"
-    
-    val_str = f"{int(current_val)}" if isinstance(current_val, (int, float)) and current_val == int(current_val) else f"{current_val:.1f}"
-    
-    return f"[{color}]{spike_icon}{arrow} {val_str}[/{color}]"
+def _format_metric_column(current, previous, spike_threshold, higher_is_worse=True):
+    """Formatea una columna completa de métricas (flecha, color y pico frente a la muestra previa) de una vez."""
+    current = np.asarray(current, dtype=float)
+    # Sin muestra previa no hay variación; los previos ausentes ya llegan rellenados con el valor actual.
+    delta = np.zeros_like(current) if previous is None else current - np.asarray(previous, dtype=float)
+    rising, falling = delta > 0, delta < 0
+    worse, better = ("red", "green") if higher_is_worse else ("green", "red")
+    spikes = np.where(np.abs(delta) > spike_threshold, "🔥", "")
+    arrows = np.select([rising, falling], ["🔼", "🔽"], " ")
+    colors = np.select([rising, falling], [worse, better], "white")
+    return [
+        f"[{color}]{spike}{arrow} {value:.0f}[/{color}]" if value.is_integer() else f"[{color}]{spike}{arrow} {value:.1f}[/{color}]"
+        for color, spike, arrow, value in zip(colors, spikes, arrows, current.tolist())
+    ]
 
-def format_delta(current, previous):
-    if pd.isna(previous):
-        return f"{current:.1f}" if isinstance(current, float) else str(current)
+def format_delta(current, previous, spec="d"):
+    """Valor con flecha de variación frente a la muestra previa. `spec` es el formato del valor ("d" para conteos, ".1f" para MB)."""
+    value = f"{current:{spec}}"
+    # `previous != previous` es la comprobación de NaN para un escalar, sin el despacho de `pd.isna`.
+    if previous is None or previous != previous or current == previous:
+        return value
     if current > previous:
-        return f"[red]🔼 {current:.1f}[/red]" if isinstance(current, float) else f"[red]🔼 {current}[/red]"
-    elif current < previous:
-        return f"[green]🔽 {current:.1f}[/green]" if isinstance(current, float) else f"[green]🔽 {current}[/green]"
-    return f"{current:.1f}" if isinstance(current, float) else str(current)
+        return f"[red]🔼 {value}[/red]"
+    return f"[green]🔽 {value}[/green]"
 
 
 # --- Funciones de renderizado de componentes de UI ---
 def _render_header(analyzer) -> Panel:
     health = analyzer.cluster_health
     status = health.get('status', 'N/A').upper()
-    status_color = {"GREEN": "green", "YELLOW": "yellow", "RED": "red"}.get(status, "white")
-    
-    heap_pct = (analyzer.cluster_stats.get('nodes', {}).get('jvm', {}).get('mem', {}).get('heap_used_in_bytes', 0) / analyzer.cluster_stats.get('nodes', {}).get('jvm', {}).get('mem', {}).get('heap_max_in_bytes', 1) * 100)
+    status_color = _STATUS_COLORS.get(status, "white")
     
     shard_status_str = (f"Initializing: [yellow]{health.get('initializing_shards', 0)}[/yellow] | "
                         f"Relocating: [yellow]{health.get('relocating_shards', 0)}[/yellow] | "
@@ -60,8 +102,8 @@ def _render_header(analyzer) -> Panel:
 
     summary_text = (
         f"Cluster: [b]{analyzer.cluster_stats.get('cluster_name', 'N/A')}[/b] | Status: [b {status_color}]{status}[/b {status_color}] | "
-        f"Última Actualización: {datetime.now().strftime('%H:%M:%S')}\n"
-        f"Heap Total: {heap_pct:.1f}% | Tareas Pendientes: {len(analyzer.pending_tasks.get('tasks', []))} | {shard_status_str}"
+        f"Última Actualización: {_clock_str(int(analyzer.last_fetch_time)) if analyzer.last_fetch_time else 'N/A'}\n"
+        f"Heap Total: {analyzer.heap_pct:.1f}% | Tareas Pendientes: {len(analyzer.pending_tasks.get('tasks', []))} | {shard_status_str}"
     )
     return Panel(summary_text, title="[b cyan]Dashboard de Salud Elasticsearch[/b cyan]", border_style="cyan")
 
@@ -69,114 +111,121 @@ def _render_node_health_table(analyzer, previous_df=None) -> Panel:
     if analyzer.nodes_df.empty:
         return Panel("[yellow]Esperando datos de nodos...[/yellow]", border_style="yellow")
         
-    table = Table(title="[b]Salud de Nodos por Tier[/b]", expand=True)
-    table.add_column("Tier", style="magenta")
-    table.add_column("Nodo", style="cyan", no_wrap=True)
-    table.add_column("CPU%", justify="right")
-    table.add_column("Heap%", justify="right")
-    table.add_column("Heap Old%", justify="right")
-    table.add_column("GC (c/t ms)", justify="right")
-    table.add_column("Rechazos", justify="right")
+    table = _build_table("[b]Salud de Nodos por Tier[/b]", _NODE_HEALTH_COLUMNS)
 
     if previous_df is None or previous_df.empty:
-        merged_df = analyzer.nodes_df.copy()
+        merged_df = analyzer.nodes_df
     else:
-        merged_df = analyzer.nodes_df.merge(previous_df, on="node_name", how="left", suffixes=("", "_prev"))
-
-    for tier, group in merged_df.groupby('tier'):
-        table.add_section()
-        for _, row in group.iterrows():
-            cpu_str = _format_metric(row['cpu_percent'], row.get('cpu_percent_prev'), spike_threshold=20)
-            heap_str = _format_metric(row['heap_percent'], row.get('heap_percent_prev'), spike_threshold=10)
-            heap_old_str = _format_metric(row['heap_old_gen_percent'], row.get('heap_old_gen_percent_prev'), spike_threshold=15)
-            
-            gc_count_str = _format_metric(row['gc_count'], row.get('gc_count_prev'), spike_threshold=GC_COUNT_SPIKE_THRESHOLD)
-            gc_time_str = _format_metric(row['gc_time_ms'], row.get('gc_time_ms_prev'), spike_threshold=GC_TIME_SPIKE_THRESHOLD)
-            gc_str = f"{gc_count_str}/{gc_time_str}"
-            
-            rejections_str = _format_metric(row['rejections'], row.get('rejections_prev'), spike_threshold=0)
-
-            table.add_row(f"[{'yellow' if 'hot' in tier else 'blue'}]{tier}[/]", row['node_name'], cpu_str, heap_str, heap_old_str, gc_str, rejections_str)
+        # Un único reindex por nombre de nodo alinea todas las métricas previas; concat las adjunta sin el coste de un merge.
+        delta_cols = list(_NODE_DELTA_COLUMNS)
+        current = analyzer.nodes_df
+        prev = previous_df.drop_duplicates('node_name').set_index('node_name')[delta_cols].reindex(current['node_name'].to_numpy())
+        prev.index = current.index
+        # Un nodo sin muestra previa toma su valor actual (delta 0) de una vez, en lugar de tratar el NaN fila a fila.
+        merged_df = pd.concat([current, prev.fillna(current[delta_cols]).add_suffix('_prev')], axis=1)
+
+    def formatted(col, spike_threshold):
+        return _format_metric_column(merged_df[col], merged_df.get(f"{col}_prev"), spike_threshold)
+
+    merged_df = merged_df.assign(
+        cpu_str=formatted('cpu_percent', 20),
+        heap_str=formatted('heap_percent', 10),
+        heap_old_str=formatted('heap_old_gen_percent', 15),
+        gc_str=[f"{count}/{time_ms}" for count, time_ms in zip(formatted('gc_count', GC_COUNT_SPIKE_THRESHOLD), formatted('gc_time_ms', GC_TIME_SPIKE_THRESHOLD))],
+        rejections_str=formatted('rejections', 0),
+    )
+
+    # Un único recorrido ordenado por tier (estable, como groupby); se abre una sección cada vez que cambia el tier.
+    rows = merged_df[['tier', 'node_name', 'cpu_str', 'heap_str', 'heap_old_str', 'gc_str', 'rejections_str']].sort_values('tier', kind='stable')
+    prev_tier = None
+    for row in rows.itertuples(index=False):
+        if row.tier != prev_tier:
+            table.add_section()
+            prev_tier = row.tier
+        table.add_row(_tier_markup(row.tier), row.node_name, row.cpu_str, row.heap_str, row.heap_old_str, row.gc_str, row.rejections_str)
         
     return Panel(table, border_style="green")
     
-def _render_top_n_rankings(analyzer, previous_df=None, time_delta=None) -> Panel:
+def _render_top_n_rankings(analyzer) -> Panel:
     if analyzer.indices_df.empty:
         return Panel("[yellow]No hay datos de índices disponibles.[/yellow]", title="[b cyan]Rankings de Rendimiento de Índices[/b cyan]", border_style="yellow")
     
-    current_indices = analyzer.indices_df.copy()
-    if previous_df is not None and not previous_df.empty:
-        time_delta = time_delta or REFRESH_INTERVAL
-        merged_df = pd.merge(current_indices, previous_df[['index', 'indexing_total', 'search_total']], on='index', how='left', suffixes=('', '_prev'))
-        merged_df['indexing_total_prev'] = merged_df['indexing_total_prev'].fillna(merged_df['indexing_total'])
-        merged_df['search_total_prev'] = merged_df['search_total_prev'].fillna(merged_df['search_total'])
-        current_indices['write_rate'] = (merged_df['indexing_total'] - merged_df['indexing_total_prev']) / time_delta
-        current_indices['search_rate'] = (merged_df['search_total'] - merged_df['search_total_prev']) / time_delta
-    else:
-        current_indices['write_rate'] = 0.0
-        current_indices['search_rate'] = 0.0
-    
-    top_writers = current_indices.sort_values('write_rate', ascending=False).head(5)
-    writers_table = Table(title="[b]Top 5 - Tasa Escritura[/b]", expand=True)
-    writers_table.add_column("Índice")
-    writers_table.add_column("docs/s", justify="right")
-    for _, r in top_writers.iterrows(): writers_table.add_row(r['index'], f"{r.get('write_rate', 0):.1f}")
-
-    top_searchers = current_indices.sort_values('search_rate', ascending=False).head(5)
-    searchers_table = Table(title="[b]Top 5 - Tasa Búsqueda[/b]", expand=True)
-    searchers_table.add_column("Índice")
-    searchers_table.add_column("req/s", justify="right")
-    for _, r in top_searchers.iterrows(): searchers_table.add_row(r['index'], f"{r.get('search_rate', 0):.1f}")
+    # Las tasas llegan calculadas desde el analizador.
+    top_writers = analyzer.indices_df.nlargest(5, 'write_rate')
+    writers_table = _build_table("[b]Top 5 - Tasa Escritura[/b]", _TOP_WRITERS_COLUMNS)
+    for index_name, rate in zip(top_writers['index'], top_writers['write_rate']): writers_table.add_row(index_name, f"{rate:.1f}")
+
+    top_searchers = analyzer.indices_df.nlargest(5, 'search_rate')
+    searchers_table = _build_table("[b]Top 5 - Tasa Búsqueda[/b]", _TOP_SEARCHERS_COLUMNS)
+    for index_name, rate in zip(top_searchers['index'], top_searchers['search_rate']): searchers_table.add_row(index_name, f"{rate:.1f}")
     
-    heap_table = Table(title="[b]Top 5 - Uso de Heap por Índice[/b]", expand=True)
-    heap_table.add_column("Índice")
-    heap_table.add_column("Total (MB)", justify="right")
-    heap_table.add_column("Seg/Cache/Field", justify="right")
-    for _, r in analyzer.top_heap_indices.iterrows():
-        breakdown = f"{r['memory_segments_mb']:.1f}/{r['memory_cache_mb']:.1f}/{r['memory_fielddata_mb']:.1f}"
-        heap_table.add_row(r['index'], f"{r['heap_usage_mb']:.1f}", breakdown)
+    heap_table = _build_table("[b]Top 5 - Uso de Heap por Índice[/b]", _TOP_HEAP_COLUMNS)
+    for r in analyzer.top_heap_indices.itertuples(index=False):
+        breakdown = f"{r.memory_segments_mb:.1f}/{r.memory_cache_mb:.1f}/{r.memory_fielddata_mb:.1f}"
+        heap_table.add_row(r.index, f"{r.heap_usage_mb:.1f}", breakdown)
 
     return Panel(Columns([writers_table, searchers_table, heap_table]), title="[b cyan]Rankings de Rendimiento de Índices[/b cyan]", border_style="cyan")
 
-def _render_actionable_suggestions(analyzer) -> Panel:
+def _collect_suggestions(analyzer):
+    """Lista de sugerencias (con markup de rich) a partir del estado actual del analizador."""
     suggestions = []
-    if analyzer.nodes_df.empty:
-        return Panel("[yellow]Esperando datos para generar sugerencias...[/yellow]", border_style="yellow")
 
-    for _, node in analyzer.nodes_df.iterrows():
-        if node['heap_old_gen_percent'] > HEAP_OLD_GEN_THRESHOLD:
-            suggestion = f"🚨 [bold]Heap Old Gen Alto en '{node['node_name']}'[/bold]: Riesgo de pausas largas de GC."
-            if not analyzer.top_heap_indices.empty:
-                top_consumer = analyzer.top_heap_indices.iloc[0]
-                suggestion += f" El índice [cyan]'{top_consumer['index']}'[/cyan] es el que más memoria consume ({top_consumer['heap_usage_mb']:.1f} MB)."
-            suggestions.append(suggestion)
+    nodes_df = analyzer.nodes_df
+    flags = np.column_stack([
+        nodes_df['heap_old_gen_percent'].to_numpy() > HEAP_OLD_GEN_THRESHOLD,
+        nodes_df['cpu_percent'].to_numpy() > CPU_USAGE_THRESHOLD,
+        nodes_df['gc_time_ms'].to_numpy() > GC_TIME_THRESHOLD,
+        nodes_df['rejections'].to_numpy() > 0,
+        nodes_df['breakers_tripped'].to_numpy() > 0,
+    ])
+    any_high_heap, _, _, any_rejecting, _ = flags.any(axis=0)
+
+    # Las pistas sobre el índice responsable son comunes a todos los nodos: se calculan una sola vez y solo si alguna alerta las usa.
+    heap_hint = ""
+    if any_high_heap and not analyzer.top_heap_indices.empty:
+        top_consumer = analyzer.top_heap_indices.iloc[0]
+        heap_hint = f" El índice [cyan]'{top_consumer['index']}'[/cyan] es el que más memoria consume ({top_consumer['heap_usage_mb']:.1f} MB)."
+    writer_hint = ""
+    indices_df = analyzer.indices_df
+    top_writer = indices_df.nlargest(1, 'write_rate').iloc[0] if any_rejecting and not indices_df.empty else None
+    if top_writer is not None and top_writer['write_rate'] > 0:
+        writer_hint = f" La alta tasa de [cyan]'{top_writer['index']}'[/cyan] podría ser la causa. Considera escalar nodos o revisar shards."
 
-        if node['cpu_percent'] > CPU_USAGE_THRESHOLD:
-            suggestions.append(f"🔥 [bold]CPU Alta en '{node['node_name']}'[/bold]: Revisa consultas costosas o picos de ingesta. Usa el análisis de tareas lentas.")
+    node_names = nodes_df['node_name'].to_numpy()
+    # Solo se recorren los nodos con alguna alerta: en un clúster sano el bucle no itera.
+    for i in np.flatnonzero(flags.any(axis=1)):
+        node_name = node_names[i]
+        high_heap, high_cpu, high_gc, rejecting, tripped = flags[i]
+        if high_heap:
+            suggestions.append(f"🚨 [bold]Heap Old Gen Alto en '{node_name}'[/bold]: Riesgo de pausas largas de GC.{heap_hint}")
+
+        if high_cpu:
+            suggestions.append(f"🔥 [bold]CPU Alta en '{node_name}'[/bold]: Revisa consultas costosas o picos de ingesta. Usa el análisis de tareas lentas.")
         
-        if node['gc_time_ms'] > GC_TIME_THRESHOLD:
-            suggestions.append(f"🗑️ [bold]GC Excesivo en '{node['node_name']}'[/bold]: El nodo está pausando para limpiar memoria. Revisa el uso de heap.")
+        if high_gc:
+            suggestions.append(f"🗑️ [bold]GC Excesivo en '{node_name}'[/bold]: El nodo está pausando para limpiar memoria. Revisa el uso de heap.")
         
-        if node['rejections'] > 0:
-            suggestion = f"🚦 [bold]Rechazos de Escritura en '{node['node_name']}'[/bold]: El nodo no puede procesar la carga de ingesta."
-            if not analyzer.indices_df.empty and 'write_rate' in analyzer.indices_df.columns:
-                top_writer = analyzer.indices_df.sort_values('write_rate', ascending=False).iloc[0]
-                if top_writer['write_rate'] > 0:
-                    suggestion += f" La alta tasa de [cyan]'{top_writer['index']}'[/cyan] podría ser la causa. Considera escalar nodos o revisar shards."
-            suggestions.append(suggestion)
-
-        if node['breakers_tripped'] > 0:
-            suggestions.append(f"🛑 [bold red]¡CIRCUIT BREAKER ACTIVADO en '{node['node_name']}'![/bold red] Operación rechazada por exceso de memoria. ¡CRÍTICO!")
+        if rejecting:
+            suggestions.append(f"🚦 [bold]Rechazos de Escritura en '{node_name}'[/bold]: El nodo no puede procesar la carga de ingesta.{writer_hint}")
+
+        if tripped:
+            suggestions.append(f"🛑 [bold red]¡CIRCUIT BREAKER ACTIVADO en '{node_name}'![/bold red] Operación rechazada por exceso de memoria. ¡CRÍTICO!")
     
     if analyzer.cluster_health.get('unassigned_shards', 0) > 0:
         suggestions.append(f"💔 [bold]Shards No Asignados Detectados[/bold]: Usa la API `_cluster/allocation/explain` para diagnosticar la causa.")
+    return suggestions
 
+def _render_actionable_suggestions(analyzer) -> Panel:
+    if analyzer.nodes_df.empty:
+        return Panel("[yellow]Esperando datos para generar sugerencias...[/yellow]", border_style="yellow")
+
+    suggestions = _collect_suggestions(analyzer)
     if not suggestions:
         return Panel("[bold green]✅ ¡Todo en orden! No se detectaron problemas críticos.[/bold green]", title="[bold cyan]Acciones Recomendadas (Motor Inteligente)[/bold cyan]", border_style="green")
     
     return Panel("\n".join(f"- {s}" for s in suggestions), title="[bold red]Acciones Recomendadas (Motor Inteligente)[/bold red]", border_style="red")
 
-def render_dashboard_layout(analyzer) -> Layout:
+def _build_dashboard_skeleton() -> Layout:
     layout = Layout(name="root")
     layout.split(
         Layout(name="header", size=4),
@@ -184,68 +233,68 @@ def render_dashboard_layout(analyzer) -> Layout:
         Layout(size=8, name="footer"),
     )
     layout["main"].split_row(Layout(name="side", ratio=2), Layout(name="body", ratio=3))
-    
+    return layout
+
+# El esqueleto del dashboard es fijo: se construye una vez y en cada frame solo se actualizan sus regiones.
+_DASHBOARD_LAYOUT = _build_dashboard_skeleton()
+
+def render_dashboard_layout(analyzer) -> Layout:
+    layout = _DASHBOARD_LAYOUT
     layout["header"].update(_render_header(analyzer))
     layout["side"].update(_render_node_health_table(analyzer, analyzer.previous_nodes_df))
-    layout["body"].update(_render_top_n_rankings(analyzer, analyzer.previous_indices_df, analyzer.last_fetch_time))
+    layout["body"].update(_render_top_n_rankings(analyzer))
     layout["footer"].update(_render_actionable_suggestions(analyzer))
     
     return layout
 
 def render_thread_pool_panel(node_stats, prev_node_stats):
-    tp_table = Table(title="[b]🏊 Thread Pools[/b]", expand=True)
-    tp_table.add_column("Pool", style="cyan")
-    tp_table.add_column("Activas", justify="right")
-    tp_table.add_column("En Cola", justify="right")
-    tp_table.add_column("Rechazadas", justify="right")
     current_pools = node_stats.get('thread_pool', {})
-    prev_pools = prev_node_stats.get('thread_pool', {}) if prev_node_stats else {}
-    for name, stats in sorted(current_pools.items()):
+    active_pools = []
+    for name in _sorted_names(tuple(current_pools)):
+        stats = current_pools[name]
         if stats.get('rejected', 0) > 0 or stats.get('queue', 0) > 0 or stats.get('active', 0) > 0:
-            prev_stats = prev_pools.get(name, {})
-            active_str = format_delta(stats.get('active', 0), prev_stats.get('active', 0))
-            queue_str = format_delta(stats.get('queue', 0), prev_stats.get('queue', 0))
-            rejected_str = format_delta(stats.get('rejected', 0), prev_stats.get('rejected', 0))
-            tp_table.add_row(name, active_str, queue_str, f"[red]{rejected_str}[/red]")
+            active_pools.append((name, stats))
+    # Un nodo ocioso no necesita tabla: se reutiliza un panel constante.
+    if not active_pools:
+        return _IDLE_THREAD_POOL_PANEL
+    tp_table = _build_table("[b]🏊 Thread Pools[/b]", _THREAD_POOL_COLUMNS)
+    prev_pools = prev_node_stats.get('thread_pool', {}) if prev_node_stats else {}
+    for name, stats in active_pools:
+        prev_stats = prev_pools.get(name, {})
+        active_str = format_delta(stats.get('active', 0), prev_stats.get('active', 0))
+        queue_str = format_delta(stats.get('queue', 0), prev_stats.get('queue', 0))
+        rejected_str = format_delta(stats.get('rejected', 0), prev_stats.get('rejected', 0))
+        tp_table.add_row(name, active_str, queue_str, f"[red]{rejected_str}[/red]")
     return Panel(tp_table)
 
 def render_breaker_panel(node_stats, prev_node_stats):
-    cb_table = Table(title="[b]🛑 Circuit Breakers[/b]", expand=True)
-    cb_table.add_column("Breaker", style="cyan")
-    cb_table.add_column("Límite (MB)", justify="right")
-    cb_table.add_column("Usado (MB)", justify="right")
-    cb_table.add_column("Tripped", justify="right")
+    cb_table = _build_table("[b]🛑 Circuit Breakers[/b]", _BREAKER_COLUMNS)
     current_breakers = node_stats.get('breaker', {})
     prev_breakers = prev_node_stats.get('breaker', {}) if prev_node_stats else {}
-    for name, stats in sorted(current_breakers.items()):
+    for name in _sorted_names(tuple(current_breakers)):
+        stats = current_breakers[name]
         limit_mb = stats.get('limit_size_in_bytes', 0) / 1e6
         used_mb = stats.get('estimated_size_in_bytes', 0) / 1e6
         tripped = stats.get('tripped', 0)
         prev_stats = prev_breakers.get(name, {})
-        used_mb_str = format_delta(used_mb, prev_stats.get('estimated_size_in_bytes', 0) / 1e6)
+        used_mb_str = format_delta(used_mb, prev_stats.get('estimated_size_in_bytes', 0) / 1e6, spec=".1f")
         tripped_str = format_delta(tripped, prev_stats.get('tripped', 0))
         cb_table.add_row(name, f"{limit_mb:.1f}", used_mb_str, f"[red]{tripped_str}[/red]" if tripped > 0 else tripped_str)
     return Panel(cb_table)
 
 def render_actionable_suggestions_markdown(analyzer):
     """Genera y muestra las sugerencias en formato Markdown para el modo --report."""
-    console.print(f"# Reporte de Salud del Cluster: {analyzer.cluster_stats.get('cluster_name', 'N/A')}")
-    console.print(f"**Fecha:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    console.print(f"**Estado:** {analyzer.cluster_health.get('status', 'N/A')}")
-    console.print("## 💡 Sugerencias y Alertas (Motor Inteligente)")
-    
-    suggestions_panel = _render_actionable_suggestions(analyzer)
-    
-    # Extraer el texto del panel y formatearlo como una lista Markdown
-    if hasattr(suggestions_panel.renderable, 'renderables'):
-        suggestions_text = suggestions_panel.renderable.renderables[0].text
-        # Usar rich para eliminar las etiquetas de formato
-        plain_text = Text.from_markup(suggestions_text).plain
-        for line in plain_text.split('\n'):
-            console.print(f"* {line.lstrip('- ')}")
-    else: # Fallback para el caso de "Todo en orden"
-        console.print(f"* {suggestions_panel.renderable.plain}")
-
-def render_historical_report(analyzer, window_seconds: int, window_str: str):
-    """Genera un reporte único comparando con un snapshot histórico."""
-    console.print(f"\n[yellow]Esta función de reporte histórico aún no está implementada.[/yellow]")
\ No newline at end of file
+    lines = [
+        f"# Reporte de Salud del Cluster: {analyzer.cluster_stats.get('cluster_name', 'N/A')}",
+        f"**Fecha:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"**Estado:** {analyzer.cluster_health.get('status', 'N/A')}",
+        "## 💡 Sugerencias y Alertas (Motor Inteligente)",
+    ]
+    if analyzer.nodes_df.empty:
+        lines.append("* Esperando datos para generar sugerencias...")
+    else:
+        # Se quitan las etiquetas de rich: el reporte es texto Markdown plano.
+        suggestions = [Text.from_markup(suggestion).plain for suggestion in _collect_suggestions(analyzer)]
+        lines += [f"* {suggestion}" for suggestion in suggestions] or ["* ✅ ¡Todo en orden! No se detectaron problemas críticos."]
+    # Una única llamada a console.print: un solo paso por el pipeline de rich y una sola escritura.
+    console.print("\n".join(lines), markup=False)